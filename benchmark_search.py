@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import asyncpg
+
+from config import Config
+from tg_bot.db_models.db_gino import connect_to_db, db
+from tg_bot.db_models.indexes import DRIVER_SEARCH_INDEXES, create_indexes, drop_indexes
+from tg_bot.db_models.quick_commands import DbDriver
+from tg_bot.db_models.schemas import Driver
+from tg_bot.misc.utils import Utils as Ut, localization
+
+logger = logging.getLogger(__name__)
+
+logging.basicConfig(level=logging.INFO,
+                    format=u'%(filename)s:%(lineno)d #%(levelname)-8s [%(asctime)s] - %(name)s - %(message)s')
+
+SEED_TG_USER_ID_FROM = -10_000_000
+CODES = {
+    "car_types": [str(i) for i in range(1, 19)],
+    "basis_of_stay": [str(i) for i in range(1, 11)],
+    "availability_95_code": ["1", "2", "3"],
+    "need_internship": ["1", "2", "3", "4"],
+    "dangerous_goods": ["1", "2"],
+    "categories_availability": [str(i) for i in range(1, 7)],
+    "work_type": ["1", "2"],
+    "cadence": ["1", "2", "3", "4"],
+    "crew": ["1", "2"],
+    "driver_gender": ["1", "2"],
+    "selector_rows": ["a", "b", "c"],
+    "selector_cols": ["1", "2", "3", "4"],
+}
+
+
+def countries_codes() -> List[str]:
+    lmi = localization[Config.DEFAULT_LANG]["markups"]["inline"]
+    codes = []
+    for markup_key, rows in lmi.items():
+        if "countries_" not in markup_key:
+            continue
+
+        for row in rows:
+            codes.extend(cd for cd in row.values() if len(cd) == 2)
+
+    return codes
+
+
+def random_driver(num: int, countries: List[str]) -> dict:
+    rows = random.sample(CODES["selector_rows"], k=random.randint(1, 3))
+    return dict(
+        tg_user_id=SEED_TG_USER_ID_FROM - num, lang=Config.DEFAULT_LANG, opens_count=0, form_price=0,
+        status=int(random.random() < 0.8), name="Benchmark", birth_year=random.randint(1960, 2005),
+        phone_number="380000000000", messangers=[],
+        car_types=random.sample(CODES["car_types"], k=random.randint(1, 4)),
+        citizenships=random.sample(countries, k=random.randint(1, 2)),
+        basis_of_stay=random.choice(CODES["basis_of_stay"]),
+        availability_95_code=random.choice(CODES["availability_95_code"]),
+        date_start_work=datetime.now() + timedelta(days=random.randint(0, 365)),
+        language_skills=[f"{row}:{random.choice(CODES['selector_cols'])}" for row in rows],
+        job_experience=[f"{row}:{random.choice(CODES['selector_cols'])}" for row in rows],
+        need_internship=random.choice(CODES["need_internship"]),
+        unsuitable_countries=random.sample(countries, k=random.randint(0, 3)),
+        dangerous_goods=random.sample(CODES["dangerous_goods"], k=random.randint(0, 2)),
+        expected_salary=float(random.randint(20, 200)),
+        categories_availability=random.sample(CODES["categories_availability"], k=random.randint(1, 3)),
+        country_driving_licence=random.choice(countries), country_current_live=random.choice(countries),
+        work_type=random.choice(CODES["work_type"]),
+        cadence=random.sample(CODES["cadence"], k=random.randint(1, 2)),
+        crew=random.choice(CODES["crew"]), driver_gender=random.choice(CODES["driver_gender"])
+    )
+
+
+def random_filters(countries: List[str]) -> DbDriver:
+    return DbDriver(
+        status=1, birth_year=[1970, 1995],
+        car_types=random.sample(CODES["car_types"], k=1),
+        citizenships=random.sample(countries, k=1) if random.random() < 0.5 else None,
+        basis_of_stay=random.sample(CODES["basis_of_stay"], k=3),
+        expected_salary=[30.0, float(random.randint(80, 200))],
+        categories_availability=random.sample(CODES["categories_availability"], k=1),
+        crew=random.sample(CODES["crew"], k=1)
+    )
+
+
+async def create_database(db_name: str):
+    conn = await asyncpg.connect(
+        user=Config.DB_USER, password=Config.DB_PASSWORD, host=Config.DB_HOST, database="postgres")
+    try:
+        if not await conn.fetchval("SELECT 1 FROM pg_database WHERE datname = $1", db_name):
+            await conn.execute(f'CREATE DATABASE "{db_name}"')
+            logger.info(f"Benchmark database is created. name={db_name}")
+
+    finally:
+        await conn.close()
+
+
+async def seed(count: int, countries: List[str], chunk_size: int = 1000):
+    for chunk_from in range(0, count, chunk_size):
+        values = [random_driver(num, countries) for num in range(chunk_from, min(chunk_from + chunk_size, count))]
+        await Driver.insert().gino.all(values)
+
+    await db.status("ANALYZE drivers")
+
+
+async def cleanup():
+    await Driver.delete.where(Driver.tg_user_id <= SEED_TG_USER_ID_FROM).gino.status()
+
+
+async def measure(queries: int, countries: List[str]) -> float:
+    random.seed(queries)
+    started = time.perf_counter()
+    for _ in range(queries):
+        await random_filters(countries).search()
+
+    return (time.perf_counter() - started) / queries * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Times DbDriver.search with and without the drivers indexes.")
+    parser.add_argument("-n", "--drivers", type=int, default=50_000, help="number of drivers to seed")
+    parser.add_argument("-q", "--queries", type=int, default=200, help="number of searches per run")
+    parser.add_argument("--db-name", default=f"{Config.DB_NAME}_benchmark",
+                        help="database to seed and drop indexes in, created when missing")
+    args = parser.parse_args()
+
+    # Indexes are dropped and rows are seeded, so the bot's own database is never used
+    if args.db_name == Config.DB_NAME:
+        parser.error("--db-name must differ from DB_NAME")
+
+    await create_database(db_name=args.db_name)
+    await connect_to_db(remove_data=False, name="benchmark", db_name=args.db_name)
+    await Ut.load_localizations_files()
+    countries = countries_codes()
+
+    try:
+        logger.info(f"Seeding drivers. count={args.drivers}")
+        await seed(count=args.drivers, countries=countries)
+
+        await drop_indexes(DRIVER_SEARCH_INDEXES)
+        await db.status("ANALYZE drivers")
+        without_indexes = await measure(queries=args.queries, countries=countries)
+
+        await create_indexes(DRIVER_SEARCH_INDEXES)
+        await db.status("ANALYZE drivers")
+        with_indexes = await measure(queries=args.queries, countries=countries)
+
+        logger.info(f"Without indexes: {without_indexes:.2f} ms/search")
+        logger.info(f"With indexes: {with_indexes:.2f} ms/search")
+
+    finally:
+        try:
+            await create_indexes(DRIVER_SEARCH_INDEXES)
+
+        finally:
+            await cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -23,9 +23,47 @@ class Config:
     SUPPORT_USERNAME = os.getenv("SUPPORT_USERNAME").strip()
 
     STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY").strip()
+    STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "").strip()
+    STRIPE_WEBHOOK_HOST = os.getenv("STRIPE_WEBHOOK_HOST", "0.0.0.0").strip()
+    STRIPE_WEBHOOK_PORT = int(os.getenv("STRIPE_WEBHOOK_PORT", "8081").strip())
+    STRIPE_WEBHOOK_PATH = os.getenv("STRIPE_WEBHOOK_PATH", "/stripe/webhook").strip()
+    STRIPE_SWEEP_INTERVAL = int(os.getenv("STRIPE_SWEEP_INTERVAL", "300").strip())
+    STRIPE_POLL_MIN_INTERVAL = float(os.getenv("STRIPE_POLL_MIN_INTERVAL", "2").strip())
+    STRIPE_POLL_MAX_INTERVAL = float(os.getenv("STRIPE_POLL_MAX_INTERVAL", "60").strip())
+    STRIPE_POLL_CONCURRENCY = int(os.getenv("STRIPE_POLL_CONCURRENCY", "8").strip())
+    STRIPE_POLL_RATE = float(os.getenv("STRIPE_POLL_RATE", "20").strip())
 
     DATABASE_CLEANUP = bool(int(os.getenv("DATABASE_CLEANUP")))
     DB_USER = os.getenv("DB_USER")
     DB_PASSWORD = os.getenv("DB_PASSWORD")
     DB_HOST = os.getenv("DB_HOST")
     DB_NAME = os.getenv("DB_NAME")
+    DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2").strip())
+    DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10").strip())
+    DB_WORKER_POOL_MAX_SIZE = int(os.getenv("DB_WORKER_POOL_MAX_SIZE", "4").strip())
+    DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "30").strip())
+    DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100").strip())
+    DB_MAX_INACTIVE_CONNECTION_LIFETIME = float(os.getenv("DB_MAX_INACTIVE_CONNECTION_LIFETIME", "300").strip())
+    DB_POOL_STATS_INTERVAL = int(os.getenv("DB_POOL_STATS_INTERVAL", "60").strip())
+
+    SEARCH_COUNT_LIMIT = int(os.getenv("SEARCH_COUNT_LIMIT", "0").strip())
+    DRIVER_CARDS_CACHE_SIZE = int(os.getenv("DRIVER_CARDS_CACHE_SIZE", "5000").strip())
+    USERNAME_CACHE_TTL = int(os.getenv("USERNAME_CACHE_TTL", "86400").strip())
+    USERNAME_CACHE_SIZE = int(os.getenv("USERNAME_CACHE_SIZE", "10000").strip())
+    USERNAME_REFRESH_BACKOFF = int(os.getenv("USERNAME_REFRESH_BACKOFF", "600").strip())
+    FORMS_COUNTER_RECONCILE_INTERVAL = int(os.getenv("FORMS_COUNTER_RECONCILE_INTERVAL", "300").strip())
+    FORMS_COUNTER_STORAGE = os.getenv("FORMS_COUNTER_STORAGE", "memory").strip()
+    DEFER_MESSAGES_DELETION = bool(int(os.getenv("DEFER_MESSAGES_DELETION", "0").strip()))
+    MESSAGES_CLEANUP_STORAGE = os.getenv("MESSAGES_CLEANUP_STORAGE", "memory").strip()
+    MESSAGES_CLEANUP_MAX_PER_USER = int(os.getenv("MESSAGES_CLEANUP_MAX_PER_USER", "50").strip())
+
+    FSM_STORAGE = os.getenv("FSM_STORAGE", "memory").strip()
+    FSM_REDIS_URL = os.getenv("FSM_REDIS_URL", "redis://localhost:6379/0").strip()
+
+    BOT_MODE = os.getenv("BOT_MODE", "polling").strip()
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").strip()
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook").strip()
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "").strip()
+    WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0").strip()
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080").strip())
+    WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "1").strip())
@@ -0,0 +1,57 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+import uuid
+
+from aiohttp import ClientSession
+
+from config import Config
+from tg_bot.misc.stripe_webhook import StripeWebhook
+
+logger = logging.getLogger(__name__)
+
+logging.basicConfig(level=logging.INFO,
+                    format=u'%(filename)s:%(lineno)d #%(levelname)-8s [%(asctime)s] - %(name)s - %(message)s')
+
+
+def invoice_event(event_type: str, stripe_invoice_id: str) -> dict:
+    return {
+        "id": f"evt_fake_{uuid.uuid4().hex[:24]}",
+        "object": "event",
+        "api_version": "2024-12-18.acacia",
+        "created": int(time.time()),
+        "livemode": False,
+        "type": event_type,
+        "data": {"object": {
+            "id": stripe_invoice_id, "object": "invoice", "status": "paid" if event_type == "invoice.paid" else "void"
+        }},
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Posts signed fake Stripe invoice events to the bot's Stripe webhook.")
+    parser.add_argument("invoices", nargs="+", help="stripe_invoice_id values of the payments")
+    parser.add_argument("-t", "--type", default="invoice.paid", choices=["invoice.paid", "invoice.voided"])
+    parser.add_argument("-d", "--duplicates", type=int, default=1, help="deliveries of every event")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{Config.STRIPE_WEBHOOK_PORT}{Config.STRIPE_WEBHOOK_PATH}")
+    parser.add_argument("--bad-signature", action="store_true", help="sign events with a wrong secret")
+    args = parser.parse_args()
+
+    secret = "whsec_wrong" if args.bad_signature else Config.STRIPE_WEBHOOK_SECRET
+    async with ClientSession() as session:
+        for stripe_invoice_id in args.invoices:
+            payload = json.dumps(invoice_event(event_type=args.type, stripe_invoice_id=stripe_invoice_id))
+            for _ in range(args.duplicates):
+                headers = {
+                    StripeWebhook.SIGNATURE_HEADER: StripeWebhook.sign(payload=payload, secret=secret),
+                    "Content-Type": "application/json"
+                }
+                async with session.post(args.url, data=payload, headers=headers) as response:
+                    logger.info(f"Event delivered. type={args.type}; stripe_invoice_id={stripe_invoice_id}; "
+                                f"status={response.status}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+import argparse
+import asyncio
+import itertools
+import logging
+import random
+import time
+from typing import Dict, List
+
+from aiohttp import ClientSession
+
+logger = logging.getLogger(__name__)
+
+logging.basicConfig(level=logging.INFO,
+                    format=u'%(filename)s:%(lineno)d #%(levelname)-8s [%(asctime)s] - %(name)s - %(message)s')
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+SYNTHETIC_USER_ID_FROM = 9_000_000_000
+
+
+def synthetic_update(update_id: int, user_id: int, text: str, callback_data: str) -> Dict:
+    user = {"id": user_id, "is_bot": False, "first_name": "Load", "username": f"load_{user_id}"}
+    chat = {"id": user_id, "type": "private", "first_name": "Load"}
+    message = {"message_id": update_id, "date": int(time.time()), "chat": chat, "from": user, "text": text}
+
+    if callback_data:
+        return {"update_id": update_id, "callback_query": {
+            "id": str(update_id), "from": user, "chat_instance": str(user_id), "data": callback_data,
+            "message": message
+        }}
+
+    return {"update_id": update_id, "message": message}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0
+
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Posts synthetic Telegram updates to the bot webhook.")
+    parser.add_argument("url", help="webhook url, e.g. http://127.0.0.1:8080/webhook")
+    parser.add_argument("-n", "--updates", type=int, default=10_000, help="number of updates to post")
+    parser.add_argument("-u", "--users", type=int, default=500, help="number of synthetic users")
+    parser.add_argument("-c", "--concurrency", type=int, default=50, help="parallel requests")
+    parser.add_argument("-s", "--secret", default="", help="WEBHOOK_SECRET of the bot")
+    parser.add_argument("--text", default="/start", help="message text of the synthetic updates")
+    parser.add_argument("--callback-data", default="", help="send callback queries with this data instead")
+    args = parser.parse_args()
+
+    headers = {SECRET_HEADER: args.secret} if args.secret else {}
+    update_ids = itertools.count(1)
+    latencies, errors = [], 0
+
+    async def post_updates(session: ClientSession, count: int):
+        nonlocal errors
+        for _ in range(count):
+            update_id = next(update_ids)
+            user_id = SYNTHETIC_USER_ID_FROM + random.randrange(args.users)
+            update = synthetic_update(
+                update_id=update_id, user_id=user_id, text=args.text, callback_data=args.callback_data)
+
+            started = time.perf_counter()
+            async with session.post(args.url, json=update, headers=headers) as response:
+                if response.status != 200:
+                    errors += 1
+
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    per_worker = [args.updates // args.concurrency + (i < args.updates % args.concurrency)
+                  for i in range(args.concurrency)]
+
+    started = time.perf_counter()
+    async with ClientSession() as session:
+        await asyncio.gather(*[post_updates(session=session, count=count) for count in per_worker])
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Posted updates. count={args.updates}; errors={errors}; elapsed={elapsed:.2f}s; "
+                f"rate={args.updates / elapsed:.1f} updates/s")
+    logger.info(f"Latency: p50={percentile(latencies, 0.5):.1f}ms; p95={percentile(latencies, 0.95):.1f}ms; "
+                f"p99={percentile(latencies, 0.99):.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
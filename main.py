@@ -2,14 +2,13 @@ import asyncio
 import logging
 from multiprocessing import Process
 
-import stripe
 from aiogram.types import BotCommand
 
 from config import Config
-from tg_bot.handlers import routers
 from tg_bot.handlers.company.payments_processing import PaymentsProcessing
+from tg_bot.misc.bootstrap import Bootstrap
 from tg_bot.misc.utils import Utils as Ut
-from tg_bot.db_models.db_gino import connect_to_db
+from tg_bot.misc.webhook import WebhookServer
 
 logger = logging.getLogger(__name__)
 
@@ -18,17 +17,9 @@ logging.basicConfig(level=logging.INFO,
 
 
 async def main():
-    logging.getLogger("aiogram.event").setLevel(logging.WARNING)
-    logging.basicConfig(level=logging.INFO,
-                        format=u'%(filename)s:%(lineno)d #%(levelname)-8s [%(asctime)s] - %(name)s - %(message)s')
+    Bootstrap.setup_logging()
 
-    stripe.api_key = Config.STRIPE_SECRET_KEY
-
-    await connect_to_db(remove_data=Config.DATABASE_CLEANUP)
-    await Ut.load_localizations_files()
-
-    if routers:
-        Config.DISPATCHER.include_routers(*routers)
+    await Bootstrap.prepare_database()
 
     bot_commands = [
         BotCommand(command="start", description="Start menu"),
@@ -42,6 +33,14 @@ async def main():
     process_stripe.start()
     process_cryptomus.start()
 
+    if Config.BOT_MODE == "webhook":
+        if Config.WEBHOOK_WORKERS > 1:
+            return await WebhookServer.run_workers()
+
+        return await WebhookServer.run_single()
+
+    await Bootstrap.prepare_dispatcher()
+
     await Config.BOT.delete_webhook(drop_pending_updates=True)
     await Config.DISPATCHER.start_polling(Config.BOT, allowed_updates=Config.DISPATCHER.resolve_used_update_types())
 
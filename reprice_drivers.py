@@ -0,0 +1,39 @@
+import argparse
+import asyncio
+import logging
+
+import stripe
+
+from config import Config
+from tg_bot.db_models.db_gino import connect_to_db
+from tg_bot.db_models.migrations import apply_migrations
+from tg_bot.misc.repricing import Repricing
+from tg_bot.misc.utils import Utils as Ut
+
+logger = logging.getLogger(__name__)
+
+logging.basicConfig(level=logging.INFO,
+                    format=u'%(filename)s:%(lineno)d #%(levelname)-8s [%(asctime)s] - %(name)s - %(message)s')
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Recalculates form_price of every driver after corrections.json or BASE_FORM_PRICE change.")
+    parser.add_argument("-c", "--chunk-size", type=int, default=500, help="drivers per select/update batch")
+    parser.add_argument("-s", "--stripe-concurrency", type=int, default=8, help="parallel Stripe price rotations")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint of the current plan")
+    parser.add_argument("--dry-run", action="store_true", help="only count the drivers whose price would change")
+    args = parser.parse_args()
+
+    stripe.api_key = Config.STRIPE_SECRET_KEY
+
+    await connect_to_db(remove_data=False)
+    await apply_migrations()
+    await Ut.load_localizations_files()
+
+    repricing = Repricing(chunk_size=args.chunk_size, stripe_concurrency=args.stripe_concurrency, dry_run=args.dry_run)
+    await repricing.run(restart=args.restart)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import traceback
+from typing import Optional
+
+from sqlalchemy import text
+
+from tg_bot.db_models.db_gino import db
+from tg_bot.db_models.schemas import Driver
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUS = 1
+
+
+async def count_active_forms() -> int:
+    return await db.select([db.func.count(Driver.id)]).where(Driver.status == ACTIVE_STATUS).gino.scalar()
+
+
+class MemoryFormsBackend:
+    def __init__(self):
+        self.active_forms: Optional[int] = None
+        # Deltas seen while a reconcile waits for COUNT(*), None when no reconcile runs
+        self.pending_delta: Optional[int] = None
+        self.lock = asyncio.Lock()
+
+    async def reconcile(self) -> int:
+        # The lock only keeps reconciles apart, change() never waits for the count
+        async with self.lock:
+            self.pending_delta = 0
+            try:
+                counted = await count_active_forms()
+                self.active_forms = max(counted + self.pending_delta, 0)
+
+            finally:
+                self.pending_delta = None
+
+        return self.active_forms
+
+    async def get(self) -> Optional[int]:
+        return self.active_forms
+
+    async def change(self, delta: int):
+        if self.pending_delta is not None:
+            self.pending_delta += delta
+
+        if self.active_forms is not None:
+            self.active_forms = max(self.active_forms + delta, 0)
+
+
+class PostgresFormsBackend:
+    NAME = "active_forms"
+
+    # One row shared by every process, deltas of all webhook workers land in it
+    async def reconcile(self) -> int:
+        return await db.scalar(text(
+            "INSERT INTO counters (name, value) "
+            "SELECT :name, count(*) FROM drivers WHERE status = :status "
+            "ON CONFLICT (name) DO UPDATE SET value = excluded.value, updated_at = now() RETURNING value"
+        ).bindparams(name=self.NAME, status=ACTIVE_STATUS))
+
+    async def get(self) -> Optional[int]:
+        return await db.scalar(text("SELECT value FROM counters WHERE name = :name").bindparams(name=self.NAME))
+
+    async def change(self, delta: int):
+        await db.status(text(
+            "UPDATE counters SET value = GREATEST(value + :delta, 0), updated_at = now() WHERE name = :name"
+        ).bindparams(name=self.NAME, delta=delta))
+
+
+class FormsCounter:
+    MEMORY = "memory"
+    POSTGRES = "postgres"
+
+    ACTIVE_STATUS = ACTIVE_STATUS
+
+    backend = MemoryFormsBackend()
+
+    @classmethod
+    def configure(cls, name: str):
+        if name == cls.POSTGRES:
+            cls.backend = PostgresFormsBackend()
+
+        else:
+            cls.backend = MemoryFormsBackend()
+
+    @classmethod
+    async def reconcile(cls) -> Optional[int]:
+        try:
+            return await cls.backend.reconcile()
+
+        except Exception:
+            logger.error(traceback.format_exc())
+
+    @classmethod
+    async def get(cls) -> int:
+        try:
+            active_forms = await cls.backend.get()
+            if active_forms is None:
+                active_forms = await cls.backend.reconcile()
+
+            return active_forms if active_forms else 0
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            return 0
+
+    @classmethod
+    async def change(cls, delta: int):
+        if not delta:
+            return
+
+        try:
+            await cls.backend.change(delta)
+
+        except Exception:
+            logger.error(traceback.format_exc())
+
+    @classmethod
+    async def status_changed(cls, old_status: Optional[int], new_status: Optional[int]):
+        was_active = old_status == cls.ACTIVE_STATUS
+        is_active = new_status == cls.ACTIVE_STATUS
+        if was_active != is_active:
+            await cls.change(1 if is_active else -1)
+
+    @classmethod
+    async def reconcile_loop(cls, interval: int):
+        if interval <= 0:
+            return
+
+        while True:
+            await asyncio.sleep(interval)
+            await cls.reconcile()
@@ -1,8 +1,12 @@
+import asyncio
 import logging
+import time
+import traceback
 
 import sqlalchemy as sa
-from typing import List
+from typing import Dict, List, Optional
 from gino import Gino
+from gino.dialects.asyncpg import Pool
 from sqlalchemy import Column, DateTime
 
 from config import Config
@@ -37,10 +41,82 @@ class TimedBaseModel(BaseModel):
                         server_default=db.func.now())
 
 
-async def connect_to_db(remove_data: bool = False):
-    logger.info("Connecting to PostgreSQL...")
-    postgres_uri = f"postgresql://{Config.DB_USER}:{Config.DB_PASSWORD}@{Config.DB_HOST}/{Config.DB_NAME}"
-    await db.set_bind(postgres_uri)
+class MeteredPool(Pool):
+    # Acquire counters of the current stats window, they are reset by every snapshot
+    acquires = 0
+    timeouts = 0
+    wait_total = 0.0
+    wait_max = 0.0
+
+    async def acquire(self, *, timeout=None):
+        started = time.perf_counter()
+        try:
+            return await super().acquire(timeout=timeout)
+
+        except asyncio.TimeoutError:
+            MeteredPool.timeouts += 1
+            raise
+
+        finally:
+            wait = time.perf_counter() - started
+            MeteredPool.acquires += 1
+            MeteredPool.wait_total += wait
+            MeteredPool.wait_max = max(MeteredPool.wait_max, wait)
+
+    @classmethod
+    def snapshot(cls) -> Optional[Dict[str, float]]:
+        bind = db.bind
+        if bind is None:
+            return None
+
+        raw_pool = bind.raw_pool
+        size, idle = raw_pool.get_size(), raw_pool.get_idle_size()
+        stats = {
+            "size": size, "in_use": size - idle, "idle": idle, "max_size": raw_pool.get_max_size(),
+            "acquires": cls.acquires, "timeouts": cls.timeouts,
+            "wait_avg_ms": round(cls.wait_total / cls.acquires * 1000, 2) if cls.acquires else 0,
+            "wait_max_ms": round(cls.wait_max * 1000, 2)
+        }
+
+        cls.acquires, cls.timeouts, cls.wait_total, cls.wait_max = 0, 0, 0.0, 0.0
+        return stats
+
+    @classmethod
+    async def stats_loop(cls, name: str, interval: int):
+        while True:
+            await asyncio.sleep(interval)
+
+            try:
+                stats = cls.snapshot()
+                if stats:
+                    logger.info(f"Database pool stats. pool={name}; " + "; ".join(
+                        f"{key}={value}" for key, value in stats.items()))
+
+            except Exception:
+                logger.error(traceback.format_exc())
+
+
+pool_tasks = set()
+
+
+async def connect_to_db(remove_data: bool = False, name: str = "bot", max_size: Optional[int] = None,
+                        db_name: Optional[str] = None):
+    max_size = max_size if max_size else Config.DB_POOL_MAX_SIZE
+    min_size = min(Config.DB_POOL_MIN_SIZE, max_size)
+    logger.info(f"Connecting to PostgreSQL... pool={name}; min_size={min_size}; max_size={max_size}")
+
+    db_name = db_name if db_name else Config.DB_NAME
+    postgres_uri = f"postgresql://{Config.DB_USER}:{Config.DB_PASSWORD}@{Config.DB_HOST}/{db_name}"
+    await db.set_bind(
+        postgres_uri, pool_class=MeteredPool, min_size=min_size, max_size=max_size,
+        command_timeout=Config.DB_COMMAND_TIMEOUT, statement_cache_size=Config.DB_STATEMENT_CACHE_SIZE,
+        max_inactive_connection_lifetime=Config.DB_MAX_INACTIVE_CONNECTION_LIFETIME
+    )
+
+    if Config.DB_POOL_STATS_INTERVAL:
+        task = asyncio.create_task(MeteredPool.stats_loop(name=name, interval=Config.DB_POOL_STATS_INTERVAL))
+        pool_tasks.add(task)
+        task.add_done_callback(pool_tasks.discard)
 
     if remove_data:
         await db.gino.drop_all()
@@ -0,0 +1,81 @@
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+from tg_bot.db_models.db_gino import db
+
+MISSING = object()
+
+
+# Rows loaded while one update is handled, keyed by (model, column, value). None means there is no such row
+class IdentityMap:
+    _current: ContextVar[Optional["IdentityMap"]] = ContextVar("identity_map", default=None)
+
+    def __init__(self):
+        self.rows: Dict[Tuple[Type[db.Model], str, Any], Any] = {}
+
+    @classmethod
+    def open(cls) -> Tuple["IdentityMap", Any]:
+        identity_map = cls()
+        return identity_map, cls._current.set(identity_map)
+
+    @classmethod
+    def close(cls, token: Any):
+        identity_map = cls._current.get()
+        if identity_map is not None:
+            # Background tasks created by the handler share the map, they must not see rows after the update
+            identity_map.rows.clear()
+
+        cls._current.reset(token)
+
+    @classmethod
+    def detach(cls):
+        # A task runs in a copy of the context, so only the task stops seeing the map of the update
+        cls._current.set(None)
+
+    @classmethod
+    def current(cls) -> Optional["IdentityMap"]:
+        return cls._current.get()
+
+    @classmethod
+    def get(cls, model: Type[db.Model], column: str, value: Any) -> Any:
+        identity_map = cls._current.get()
+        if (identity_map is None) or (value is None):
+            return MISSING
+
+        return identity_map.rows.get((model, column, value), MISSING)
+
+    @classmethod
+    def put(cls, model: Type[db.Model], row: Any, column: Optional[str] = None, value: Any = None):
+        identity_map = cls._current.get()
+        if identity_map is None:
+            return
+
+        if row is None:
+            if column is not None:
+                identity_map.rows[(model, column, value)] = None
+
+            return
+
+        identity_map.rows[(model, "id", row.id)] = row
+        identity_map.rows[(model, "tg_user_id", row.tg_user_id)] = row
+
+    @classmethod
+    def forget(cls, model: Type[db.Model], db_id: Optional[int] = None, tg_user_id: Optional[int] = None):
+        identity_map = cls._current.get()
+        if identity_map is None:
+            return
+
+        for column, value in (("id", db_id), ("tg_user_id", tg_user_id)):
+            row = identity_map.rows.pop((model, column, value), None)
+            if row is not None:
+                identity_map.rows.pop((model, "id", row.id), None)
+                identity_map.rows.pop((model, "tg_user_id", row.tg_user_id), None)
+
+    @classmethod
+    async def load(cls, model: Type[db.Model], column: str, value: Any, loader: Callable[[], Awaitable[Any]]) -> Any:
+        row = cls.get(model, column, value)
+        if row is MISSING:
+            row = await loader()
+            cls.put(model, row, column=column, value=value)
+
+        return row
@@ -0,0 +1,56 @@
+import logging
+from typing import List
+
+from sqlalchemy import Index
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from tg_bot.db_models.db_gino import db
+from tg_bot.db_models.schemas import (
+    Driver, Company, Payment, CleanupMessage, CompanyDriverSave, CompanyDriverOpen
+)
+
+logger = logging.getLogger(__name__)
+
+DRIVER_ARRAY_COLUMNS = [
+    Driver.car_types, Driver.citizenships, Driver.language_skills, Driver.job_experience, Driver.unsuitable_countries,
+    Driver.categories_availability, Driver.cadence, Driver.dangerous_goods
+]
+DRIVER_SCALAR_COLUMNS = [
+    Driver.birth_year, Driver.expected_salary, Driver.date_start_work, Driver.basis_of_stay,
+    Driver.availability_95_code, Driver.need_internship, Driver.country_driving_licence, Driver.country_current_live,
+    Driver.work_type, Driver.crew, Driver.driver_gender
+]
+
+DRIVER_SEARCH_INDEXES: List[Index] = [
+    *[Index(f"ix_drivers_{column.name}_gin", column, postgresql_using="gin") for column in DRIVER_ARRAY_COLUMNS],
+    *[Index(f"ix_drivers_{column.name}", column) for column in DRIVER_SCALAR_COLUMNS],
+    Index("ix_drivers_status_id", Driver.status, Driver.id),
+]
+
+INDEXES: List[Index] = [
+    *DRIVER_SEARCH_INDEXES,
+    Index("ix_drivers_tg_user_id", Driver.tg_user_id),
+    Index("ix_companies_tg_user_id", Company.tg_user_id),
+    Index("ix_payments_system_status", Payment.system, Payment.status),
+    Index("ix_payments_creator_id_status", Payment.creator_id, Payment.status),
+    Index("ix_payments_stripe_invoice_id", Payment.stripe_invoice_id),
+    Index("ix_cleanup_messages_created_at", CleanupMessage.created_at),
+    Index("ix_company_driver_saves_driver_id", CompanyDriverSave.driver_id),
+    Index("ix_company_driver_opens_driver_id", CompanyDriverOpen.driver_id),
+]
+
+
+async def create_indexes(indexes: List[Index] = INDEXES):
+    dialect = postgresql.dialect()
+    for index in indexes:
+        statement = str(CreateIndex(index).compile(dialect=dialect))
+        statement = statement.replace("CREATE INDEX ", "CREATE INDEX IF NOT EXISTS ", 1)
+        await db.status(statement)
+
+    logger.info(f"Database indexes are ready. count={len(indexes)}")
+
+
+async def drop_indexes(indexes: List[Index] = INDEXES):
+    for index in indexes:
+        await db.status(f"DROP INDEX IF EXISTS {index.name}")
@@ -0,0 +1,41 @@
+import logging
+from typing import List
+
+from tg_bot.db_models.db_gino import db
+
+logger = logging.getLogger(__name__)
+
+COMPANY_DRIVERS_ARRAYS = [
+    ("saved_drivers", "company_driver_saves"),
+    ("open_drivers", "company_driver_opens"),
+]
+
+MIGRATIONS: List[str] = [
+    "ALTER TABLE drivers ADD COLUMN IF NOT EXISTS username VARCHAR",
+    # Company drivers arrays are moved to the relation tables, the array order is kept in created_at.
+    # Arrays are emptied in the same statement, so the move is done once. Databases without the legacy column skip it
+    *[
+        f"DO $$ BEGIN "
+        f"IF EXISTS (SELECT 1 FROM information_schema.columns WHERE table_schema = current_schema() "
+        f"AND table_name = 'companies' AND column_name = '{column}') THEN EXECUTE $move$"
+        f"WITH moved AS ("
+        f"UPDATE companies c SET {column} = NULL FROM companies old "
+        f"WHERE old.id = c.id AND old.tg_user_id = c.tg_user_id AND old.{column} IS NOT NULL "
+        f"RETURNING c.id, old.{column} AS drivers_ids) "
+        f"INSERT INTO {table} (company_id, driver_id, created_at, updated_at) "
+        f"SELECT moved.id, d.driver_id, now() - interval '1 second' * (cardinality(moved.drivers_ids) - d.position), "
+        f"now() FROM moved, unnest(moved.drivers_ids) WITH ORDINALITY AS d(driver_id, position) "
+        f"WHERE d.driver_id IS NOT NULL ON CONFLICT DO NOTHING"
+        f"$move$; END IF; END $$"
+        for column, table in COMPANY_DRIVERS_ARRAYS
+    ],
+    # Viewed drivers are tracked by the search cursor, the views relation is not read anywhere
+    "DROP TABLE IF EXISTS company_driver_views",
+]
+
+
+async def apply_migrations():
+    for statement in MIGRATIONS:
+        await db.status(statement)
+
+    logger.info(f"Database migrations are applied. count={len(MIGRATIONS)}")
@@ -1,18 +1,28 @@
 import logging
 import traceback
 from datetime import datetime
-from typing import Optional, Union, List
+from typing import Optional, Union, List, Tuple, Callable, Awaitable, Dict, Any
 
 from asyncpg import UniqueViolationError
-from sqlalchemy import and_, func, select
+from gino.loader import ColumnLoader
+from sqlalchemy import and_, func, select, true, text, exists
+from sqlalchemy.dialects.postgresql import insert
 
+from tg_bot.db_models.counters import FormsCounter
 from tg_bot.db_models.db_gino import db
+from tg_bot.db_models.identity_map import IdentityMap
 from tg_bot.db_models.schemas import *
 
 logger = logging.getLogger(__name__)
 
 
 class DbDriver:
+    COUNT_EXACT = "exact"
+    COUNT_CAPPED = "capped"
+    COUNT_NONE = "none"
+
+    update_listeners: List[Callable[[int], Awaitable]] = []
+
     def __init__(
             self, db_id: Optional[int] = None, tg_user_id: Optional[int] = None, opens_count: Optional[int] = None,
             form_price: Optional[float] = None, name: Optional[str] = None,
@@ -28,7 +38,7 @@ class DbDriver:
             cadence: Optional[List[str]] = None, crew: Optional[str] = None, driver_gender: Optional[str] = None,
             lang: Optional[str] = None, status: Optional[int] = None, messangers: Optional[List[str]] = None,
             need_internship: Optional[str] = None, stripe_product_id: Optional[str] = None,
-            stripe_price_id: Optional[str] = None
+            stripe_price_id: Optional[str] = None, username: Optional[str] = None
     ):
         self.db_id = db_id
         self.tg_user_id = tg_user_id
@@ -60,6 +70,7 @@ class DbDriver:
         self.status = status
         self.stripe_product_id = stripe_product_id
         self.stripe_price_id = stripe_price_id
+        self.username = username
 
     async def add(self) -> Union[Driver, bool]:
         try:
@@ -74,122 +85,195 @@ class DbDriver:
                 country_driving_licence=self.country_driving_licence, country_current_live=self.country_current_live,
                 work_type=self.work_type, cadence=self.cadence, crew=self.crew, driver_gender=self.driver_gender,
                 form_price=self.form_price, lang=self.lang, status=self.status, messangers=self.messangers,
-                stripe_product_id=self.stripe_product_id, stripe_price_id=self.stripe_price_id
+                stripe_product_id=self.stripe_product_id, stripe_price_id=self.stripe_price_id,
+                username=self.username
             )
-            return await target.create()
+            result = await target.create()
+            IdentityMap.put(Driver, result)
+            await FormsCounter.status_changed(old_status=None, new_status=result.status)
+            return result
 
         except UniqueViolationError as ex:
             logger.error(ex)
             return False
 
-    async def select(self, viewed_drivers_id: Optional[List[int]] = None, count_records: bool = False
-                     ) -> Union[Driver, List[Driver], bool, None]:
+    async def select(self) -> Union[Driver, List[Driver], bool, None]:
         try:
             q = Driver.query
 
-            if viewed_drivers_id is None:
-                if self.db_id is not None:
-                    return await q.where(Driver.id == self.db_id).gino.first()
+            if self.db_id is not None:
+                return await IdentityMap.load(Driver, "id", self.db_id, q.where(Driver.id == self.db_id).gino.first)
 
-                elif self.tg_user_id is not None:
-                    return await q.where(Driver.tg_user_id == self.tg_user_id).gino.first()
+            elif self.tg_user_id is not None:
+                return await IdentityMap.load(
+                    Driver, "tg_user_id", self.tg_user_id, q.where(Driver.tg_user_id == self.tg_user_id).gino.first)
 
-                elif self.status is not None:
-                    return await q.where(Driver.status == self.status).gino.all()
+            elif self.status is not None:
+                return await q.where(Driver.status == self.status).gino.all()
 
-                else:
-                    return await q.gino.all()
+            else:
+                return await q.gino.all()
 
-            filters = [~Driver.id.in_(viewed_drivers_id)]
-            if self.status is not None:
-                filters.append(Driver.status == self.status)
+        except Exception as ex:
+            logger.error(ex)
+            return False
+
+    def search_filters(self, last_seen_id: Optional[int] = None, opened_by: Optional[int] = None) -> list:
+        filters = []
+        if opened_by is not None:
+            filters.append(~exists().where(
+                and_(CompanyDriverOpen.company_id == opened_by, CompanyDriverOpen.driver_id == Driver.id)))
 
-            if self.birth_year and self.birth_year[0] and self.birth_year[1]:
-                filters.append(Driver.birth_year >= self.birth_year[0])
-                filters.append(Driver.birth_year <= self.birth_year[1])
+        if last_seen_id is not None:
+            filters.append(Driver.id > last_seen_id)
 
-            if self.car_types:
-                filters.append(Driver.car_types.op("@>")(self.car_types))
+        if self.status is not None:
+            filters.append(Driver.status == self.status)
 
-            if self.citizenships:
-                filters.append(Driver.citizenships.op("@>")(self.citizenships))
+        if self.birth_year and self.birth_year[0] and self.birth_year[1]:
+            filters.append(Driver.birth_year >= self.birth_year[0])
+            filters.append(Driver.birth_year <= self.birth_year[1])
 
-            if self.basis_of_stay:
-                filters.append(Driver.basis_of_stay.in_(self.basis_of_stay))
+        if self.car_types:
+            filters.append(Driver.car_types.op("@>")(self.car_types))
 
-            if self.availability_95_code:
-                filters.append(Driver.availability_95_code.in_(self.availability_95_code))
+        if self.citizenships:
+            filters.append(Driver.citizenships.op("@>")(self.citizenships))
 
-            if self.date_start_work and self.date_start_work[0] and self.date_start_work[1]:
-                filters.append(Driver.date_start_work >= self.date_start_work[0])
-                filters.append(Driver.date_start_work <= self.date_start_work[1])
+        if self.basis_of_stay:
+            filters.append(Driver.basis_of_stay.in_(self.basis_of_stay))
 
-            if self.language_skills:
-                filters.append(Driver.language_skills.op("@>")(self.language_skills))
+        if self.availability_95_code:
+            filters.append(Driver.availability_95_code.in_(self.availability_95_code))
 
-            if self.job_experience:
-                filters.append(Driver.job_experience.op("@>")(self.job_experience))
+        if self.date_start_work and self.date_start_work[0] and self.date_start_work[1]:
+            filters.append(Driver.date_start_work >= self.date_start_work[0])
+            filters.append(Driver.date_start_work <= self.date_start_work[1])
 
-            if self.need_internship:
-                filters.append(Driver.need_internship.in_(self.need_internship))
+        if self.language_skills:
+            filters.append(Driver.language_skills.op("@>")(self.language_skills))
 
-            if self.unsuitable_countries:
-                filters.append(Driver.unsuitable_countries.op("@>")(self.unsuitable_countries))
+        if self.job_experience:
+            filters.append(Driver.job_experience.op("@>")(self.job_experience))
 
-            if self.expected_salary and self.expected_salary[0] and self.expected_salary[1]:
-                filters.append(Driver.expected_salary >= self.expected_salary[0])
-                filters.append(Driver.expected_salary <= self.expected_salary[1])
+        if self.need_internship:
+            filters.append(Driver.need_internship.in_(self.need_internship))
 
-            if self.categories_availability:
-                filters.append(Driver.categories_availability.op("@>")(self.categories_availability))
+        if self.unsuitable_countries:
+            filters.append(Driver.unsuitable_countries.op("@>")(self.unsuitable_countries))
 
-            if self.country_driving_licence:
-                filters.append(Driver.country_driving_licence.in_(self.country_driving_licence))
+        if self.expected_salary and self.expected_salary[0] and self.expected_salary[1]:
+            filters.append(Driver.expected_salary >= self.expected_salary[0])
+            filters.append(Driver.expected_salary <= self.expected_salary[1])
 
-            if self.country_current_live:
-                filters.append(Driver.country_current_live.in_(self.country_current_live))
+        if self.categories_availability:
+            filters.append(Driver.categories_availability.op("@>")(self.categories_availability))
 
-            if self.work_type:
-                filters.append(Driver.work_type.in_(self.work_type))
+        if self.country_driving_licence:
+            filters.append(Driver.country_driving_licence.in_(self.country_driving_licence))
 
-            if self.cadence:
-                filters.append(Driver.cadence.op("@>")(self.cadence))
+        if self.country_current_live:
+            filters.append(Driver.country_current_live.in_(self.country_current_live))
 
-            if self.dangerous_goods:
-                filters.append(Driver.dangerous_goods.op("@>")(self.dangerous_goods))
+        if self.work_type:
+            filters.append(Driver.work_type.in_(self.work_type))
 
-            if self.crew:
-                filters.append(Driver.crew.in_(self.crew))
+        if self.cadence:
+            filters.append(Driver.cadence.op("@>")(self.cadence))
 
-            if self.driver_gender:
-                filters.append(Driver.driver_gender.in_(self.driver_gender))
+        if self.dangerous_goods:
+            filters.append(Driver.dangerous_goods.op("@>")(self.dangerous_goods))
 
-            if filters:
-                q = q.where(and_(*filters))
+        if self.crew:
+            filters.append(Driver.crew.in_(self.crew))
 
-            if count_records:
-                count_query = select([func.count()]).select_from(q.alias('subq'))
-                return await db.scalar(count_query)
+        if self.driver_gender:
+            filters.append(Driver.driver_gender.in_(self.driver_gender))
+
+        return filters
+
+    async def search(self, last_seen_id: Optional[int] = None, opened_by: Optional[int] = None, limit: int = 3,
+                     count_mode: str = COUNT_EXACT, count_limit: int = 1000
+                     ) -> Tuple[List[Driver], Optional[int], bool]:
+        try:
+            filters = self.search_filters(last_seen_id=last_seen_id, opened_by=opened_by)
+            condition = and_(*filters) if filters else true()
+
+            if count_mode == self.COUNT_EXACT:
+                count_column = func.count().over()
+
+            elif count_mode == self.COUNT_CAPPED:
+                # One row over the limit tells a reached cap from an exact count
+                capped = select([Driver.id]).where(condition).limit(count_limit + 1).alias("capped")
+                count_column = select([func.count()]).select_from(capped).as_scalar()
 
             else:
-                # return await q.gino.first()
-                print("RIGHT ANSWER")
-                return await q.limit(3).gino.all()
+                drivers = await Driver.query.where(condition).order_by(Driver.id).limit(limit).gino.all()
+                return drivers, None, False
 
-        except Exception as ex:
-            logger.error(ex)
-            return False
+            count_column = count_column.label("total_count")
+            q = Driver.query.column(count_column).where(condition).order_by(Driver.id).limit(limit)
+            rows = await q.gino.load((Driver, ColumnLoader(count_column))).all()
 
-    async def update(self, **kwargs) -> bool:
+            drivers = [driver for driver, _ in rows]
+            total_count = rows[0][1] if rows else 0
+            if (count_mode == self.COUNT_CAPPED) and (total_count > count_limit):
+                return drivers, count_limit, True
+
+            return drivers, total_count, False
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            return [], 0, False
+
+    def row_condition(self):
+        if self.db_id is not None:
+            return Driver.id == self.db_id
+
+        elif self.tg_user_id is not None:
+            return Driver.tg_user_id == self.tg_user_id
+
+    async def update(self, only_changed: bool = False, **kwargs) -> Union[Driver, Dict[str, Any], bool, None]:
         try:
-            if not kwargs:
+            condition = self.row_condition()
+            if (not kwargs) or (condition is None):
                 return False
 
-            target = await self.select()
-            return await target.update(**kwargs).apply()
+            # The locked subquery keeps the status before the update, so it is still one statement
+            old = select([Driver.id, Driver.status]).where(condition).with_for_update().alias("old")
+            old_status = old.c.status.label("old_status")
+            q = Driver.update.values(**kwargs).where(Driver.id == old.c.id)
+
+            if only_changed:
+                changed_columns = [getattr(Driver, key) for key in kwargs]
+                row = await q.returning(Driver.id, old_status, *changed_columns).gino.first()
+                if row is None:
+                    return None
+
+                driver_id, status_before = row[0], row[1]
+                result = {key: row[i + 2] for i, key in enumerate(kwargs)}
+                IdentityMap.forget(Driver, db_id=driver_id)
+
+            else:
+                row = await q.returning(*Driver, old_status).gino.load((Driver, ColumnLoader(old_status))).first()
+                if row is None:
+                    return None
+
+                result, status_before = row
+                driver_id = result.id
+                IdentityMap.put(Driver, result)
+
+            if "status" in kwargs:
+                await FormsCounter.status_changed(old_status=status_before, new_status=kwargs["status"])
+
+            for listener in DbDriver.update_listeners:
+                await listener(driver_id)
+
+            return result
 
         except Exception:
             logger.error(traceback.format_exc())
+            IdentityMap.forget(Driver, db_id=self.db_id, tg_user_id=self.tg_user_id)
             return False
 
     async def remove(self) -> Union[bool, List[bool]]:
@@ -199,17 +283,89 @@ class DbDriver:
                 results = []
                 for i in target:
                     results.append(await i.delete())
+                    await DbDriver(db_id=i.id).remove_relations()
+                    IdentityMap.forget(Driver, db_id=i.id)
+                    await FormsCounter.status_changed(old_status=i.status, new_status=None)
 
                 return results
 
             elif isinstance(target, Driver):
-                return await target.delete()
+                result = await target.delete()
+                await DbDriver(db_id=target.id).remove_relations()
+                IdentityMap.forget(Driver, db_id=target.id)
+                await FormsCounter.status_changed(old_status=target.status, new_status=None)
+                return result
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            return False
+
+    async def remove_relations(self):
+        for model in DbCompany.RELATIONS.values():
+            await model.delete.where(model.driver_id == self.db_id).gino.status()
+
+    @staticmethod
+    async def update_username(tg_user_id: int, username: Optional[str]) -> bool:
+        try:
+            # Companies and unregistered users have no row, only a changed driver username is written
+            stored = await db.first(select([Driver.username]).where(Driver.tg_user_id == tg_user_id))
+            if (stored is None) or (stored[0] == username):
+                return False
+
+            return await Driver.update.values(username=username).where(
+                and_(Driver.tg_user_id == tg_user_id, Driver.username.is_distinct_from(username))).gino.status()
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            return False
+
+    @staticmethod
+    async def select_chunk(after_id: int, limit: int) -> List[Driver]:
+        try:
+            return await Driver.query.where(Driver.id > after_id).order_by(Driver.id).limit(limit).gino.all()
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            return []
+
+    @staticmethod
+    async def update_prices(rows: List[Tuple[int, float, Optional[str]]]) -> bool:
+        try:
+            if not rows:
+                return True
+
+            values, params = [], {}
+            for num, (driver_id, form_price, stripe_price_id) in enumerate(rows):
+                values.append(f"(CAST(:id_{num} AS BIGINT), CAST(:form_price_{num} AS DOUBLE PRECISION), "
+                              f"CAST(:stripe_price_id_{num} AS VARCHAR))")
+                params.update({
+                    f"id_{num}": driver_id, f"form_price_{num}": form_price, f"stripe_price_id_{num}": stripe_price_id
+                })
+
+            query = text(
+                "UPDATE drivers AS d "
+                "SET form_price = v.form_price, stripe_price_id = v.stripe_price_id, updated_at = now() "
+                f"FROM (VALUES {', '.join(values)}) AS v (id, form_price, stripe_price_id) "
+                "WHERE d.id = v.id"
+            ).bindparams(**params)
+            await db.status(query)
+            return True
 
         except Exception:
             logger.error(traceback.format_exc())
             return False
 
+    @staticmethod
+    async def count_active_forms() -> int:
+        return await FormsCounter.get()
+
+
 class DbCompany:
+    SAVED = "saved"
+    OPENED = "opened"
+
+    RELATIONS = {SAVED: CompanyDriverSave, OPENED: CompanyDriverOpen}
+
     def __init__(
             self, db_id: Optional[int] = None, tg_user_id: Optional[int] = None,
             paid_subscription: Optional[int] = None, lang: Optional[str] = None,
@@ -224,15 +380,13 @@ class DbCompany:
             country_driving_licence: Optional[List[str]] = None, work_type: Optional[List[str]] = None,
             country_current_live: Optional[List[str]] = None, cadence: Optional[List[str]] = None,
             crew: Optional[List[str]] = None, driver_gender: Optional[List[str]] = None,
-            viewed_drivers: Optional[List[int]] = [], saved_drivers: Optional[List[int]] = [],
-            stripe_customer_id: Optional[str] = None, open_drivers: Optional[List[int]] = [],
+            stripe_customer_id: Optional[str] = None,
             stripe_subscribe_product_id: Optional[str] = None, stripe_subscribe_price_id: Optional[str] = None
     ):
         self.db_id = db_id
         self.tg_user_id = tg_user_id
         self.lang = lang
         self.paid_subscription = paid_subscription
-        self.viewed_drivers = viewed_drivers
         self.birth_year_left_edge = birth_year_left_edge
         self.birth_year_right_edge = birth_year_right_edge
         self.car_types = car_types
@@ -255,9 +409,7 @@ class DbCompany:
         self.dangerous_goods = dangerous_goods
         self.crew = crew
         self.driver_gender = driver_gender
-        self.saved_drivers = saved_drivers
         self.stripe_customer_id = stripe_customer_id
-        self.open_drivers = open_drivers
         self.stripe_subscribe_product_id = stripe_subscribe_product_id
         self.stripe_subscribe_price_id = stripe_subscribe_price_id
 
@@ -276,12 +428,13 @@ class DbCompany:
                 expected_salary_right_edge=self.expected_salary_right_edge,
                 categories_availability=self.categories_availability, cadence=self.cadence,
                 country_driving_licence=self.country_driving_licence, crew=self.crew,
-                country_current_live=self.country_current_live, viewed_drivers=self.viewed_drivers,
-                saved_drivers=self.saved_drivers, stripe_customer_id=self.stripe_customer_id,
-                open_drivers=self.open_drivers, stripe_subscribe_product_id=self.stripe_subscribe_product_id,
+                country_current_live=self.country_current_live, stripe_customer_id=self.stripe_customer_id,
+                stripe_subscribe_product_id=self.stripe_subscribe_product_id,
                 stripe_subscribe_price_id=self.stripe_subscribe_price_id
             )
-            return await target.create()
+            result = await target.create()
+            IdentityMap.put(Company, result)
+            return result
 
         except UniqueViolationError as ex:
             logger.error(ex)
@@ -290,10 +443,13 @@ class DbCompany:
     async def select(self) -> Union[Company, List[Company], bool, None]:
         try:
             if self.db_id:
-                return await Company.query.where(Company.id == self.db_id).gino.first()
+                return await IdentityMap.load(
+                    Company, "id", self.db_id, Company.query.where(Company.id == self.db_id).gino.first)
 
             elif self.tg_user_id:
-                return await Company.query.where(Company.tg_user_id == self.tg_user_id).gino.first()
+                return await IdentityMap.load(
+                    Company, "tg_user_id", self.tg_user_id,
+                    Company.query.where(Company.tg_user_id == self.tg_user_id).gino.first)
 
             else:
                 return await Company.query.gino.all()
@@ -302,13 +458,137 @@ class DbCompany:
             logger.error(traceback.format_exc())
             return False
 
-    async def update(self, **kwargs) -> bool:
+    def row_condition(self):
+        if self.db_id:
+            return Company.id == self.db_id
+
+        elif self.tg_user_id:
+            return Company.tg_user_id == self.tg_user_id
+
+    async def update(self, only_changed: bool = False, **kwargs) -> Union[Company, Dict[str, Any], bool, None]:
         try:
-            if not kwargs:
+            condition = self.row_condition()
+            if (not kwargs) or (condition is None):
                 return False
 
-            target = await self.select()
-            return await target.update(**kwargs).apply()
+            q = Company.update.values(**kwargs).where(condition)
+            if only_changed:
+                row = await q.returning(*[getattr(Company, key) for key in kwargs]).gino.first()
+                IdentityMap.forget(Company, db_id=self.db_id, tg_user_id=self.tg_user_id)
+                return {key: row[i] for i, key in enumerate(kwargs)} if row else None
+
+            result = await q.returning(*Company).gino.load(Company).first()
+            IdentityMap.put(Company, result)
+            return result
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            IdentityMap.forget(Company, db_id=self.db_id, tg_user_id=self.tg_user_id)
+            return False
+
+    @classmethod
+    def relation(cls, name: str):
+        return cls.RELATIONS[name]
+
+    async def add_driver(self, relation: str, driver_id: int) -> bool:
+        try:
+            model = self.relation(relation)
+            q = insert(model.__table__).values(company_id=self.db_id, driver_id=driver_id).on_conflict_do_nothing()
+            row = await q.returning(model.driver_id).gino.first()
+            return row is not None
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            return False
+
+    async def remove_driver(self, relation: str, driver_id: int) -> bool:
+        try:
+            model = self.relation(relation)
+            q = model.delete.where(and_(model.company_id == self.db_id, model.driver_id == driver_id))
+            row = await q.returning(model.driver_id).gino.first()
+            return row is not None
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            return False
+
+    async def has_driver(self, relation: str, driver_id: int) -> bool:
+        try:
+            model = self.relation(relation)
+            return bool(await db.scalar(select([func.count()]).where(
+                and_(model.company_id == self.db_id, model.driver_id == driver_id))))
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            return False
+
+    async def count_drivers(self, relation: str) -> int:
+        try:
+            model = self.relation(relation)
+            return await db.scalar(select([func.count()]).select_from(
+                model.join(Driver, Driver.id == model.driver_id)).where(model.company_id == self.db_id))
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            return 0
+
+    async def drivers_page(self, relation: str, offset: int, limit: int = 3) -> List[Driver]:
+        try:
+            model = self.relation(relation)
+            return await Driver.query.select_from(Driver.join(model, model.driver_id == Driver.id)).where(
+                model.company_id == self.db_id).order_by(model.created_at, model.driver_id).offset(offset).limit(
+                limit).gino.all()
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            return []
+
+    async def open_driver(self, driver_id: int, use_subscription: bool = False
+                          ) -> Union[Tuple[bool, Optional[int], Optional[int]], bool, None]:
+        # The company row is locked first, so the opening statement sees the opens committed by concurrent clicks.
+        # Returns (already_opened, paid_subscription left, driver opens_count), opens_count is None if not opened
+        try:
+            async with db.transaction():
+                paid_subscription = await db.first(text(
+                    "SELECT paid_subscription FROM companies WHERE id = :company_id FOR UPDATE"
+                ).bindparams(company_id=self.db_id))
+                if paid_subscription is None:
+                    return None
+
+                row = await db.first(text(
+                    "WITH target AS ("
+                    "SELECT EXISTS (SELECT 1 FROM company_driver_opens "
+                    "WHERE company_id = :company_id AND driver_id = :driver_id) AS already_opened), "
+                    "company AS ("
+                    "UPDATE companies c SET "
+                    "paid_subscription = CASE WHEN :use_subscription THEN c.paid_subscription - 1 "
+                    "ELSE c.paid_subscription END, "
+                    "updated_at = now() "
+                    "FROM target t WHERE c.id = :company_id AND NOT t.already_opened "
+                    "AND (NOT :use_subscription OR coalesce(c.paid_subscription, 0) > 0) "
+                    "AND EXISTS (SELECT 1 FROM drivers WHERE id = :driver_id) "
+                    "RETURNING c.id, c.paid_subscription), "
+                    "opened AS ("
+                    "INSERT INTO company_driver_opens (company_id, driver_id) SELECT id, :driver_id FROM company "
+                    "ON CONFLICT DO NOTHING), "
+                    "unsaved AS ("
+                    "DELETE FROM company_driver_saves "
+                    "WHERE company_id IN (SELECT id FROM company) AND driver_id = :driver_id), "
+                    "driver AS ("
+                    "UPDATE drivers SET opens_count = opens_count + 1, updated_at = now() "
+                    "WHERE id = :driver_id AND EXISTS (SELECT 1 FROM company) "
+                    "RETURNING opens_count) "
+                    "SELECT t.already_opened, (SELECT paid_subscription FROM company), "
+                    "(SELECT opens_count FROM driver) FROM target t"
+                ).bindparams(company_id=self.db_id, driver_id=driver_id, use_subscription=use_subscription))
+
+            IdentityMap.forget(Company, db_id=self.db_id)
+            IdentityMap.forget(Driver, db_id=driver_id)
+            if row[2] is not None:
+                for listener in DbDriver.update_listeners:
+                    await listener(driver_id)
+
+            return row[0], row[1] if row[2] is not None else paid_subscription[0], row[2]
 
         except Exception:
             logger.error(traceback.format_exc())
@@ -321,16 +601,25 @@ class DbCompany:
                 results = []
                 for i in target:
                     results.append(await i.delete())
+                    await DbCompany(db_id=i.id).remove_relations()
+                    IdentityMap.forget(Company, db_id=i.id)
 
                 return results
 
             elif isinstance(target, Company):
-                return await target.delete()
+                result = await target.delete()
+                await DbCompany(db_id=target.id).remove_relations()
+                IdentityMap.forget(Company, db_id=target.id)
+                return result
 
         except Exception:
             logger.error(traceback.format_exc())
             return False
 
+    async def remove_relations(self):
+        for model in self.RELATIONS.values():
+            await model.delete.where(model.company_id == self.db_id).gino.status()
+
 
 class DbPayment:
     def __init__(
@@ -369,6 +658,9 @@ class DbPayment:
             if self.db_id:
                 return await q.where(Payment.id == self.db_id).gino.first()
 
+            elif self.stripe_invoice_id:
+                return await q.where(Payment.stripe_invoice_id == self.stripe_invoice_id).gino.first()
+
             elif self.system:
                 params = [Payment.system == self.system]
                 if status_with_selected_system is not None:
@@ -399,12 +691,179 @@ class DbPayment:
             logger.error(traceback.format_exc())
             return False
 
-    async def update(self, **kwargs) -> bool:
+    def row_condition(self):
+        if self.db_id:
+            return Payment.id == self.db_id
+
+        elif self.stripe_invoice_id:
+            return Payment.stripe_invoice_id == self.stripe_invoice_id
+
+        elif self.creator_id and (self.status is not None):
+            # select() returns the first of these payments, only that one is updated
+            return Payment.id == select([Payment.id]).where(
+                and_(Payment.creator_id == self.creator_id, Payment.status == self.status)).limit(1).as_scalar()
+
+    async def update(self, only_changed: bool = False, **kwargs) -> Union[Payment, Dict[str, Any], bool, None]:
+        try:
+            condition = self.row_condition()
+            if (not kwargs) or (condition is None):
+                return False
+
+            q = Payment.update.values(**kwargs).where(condition)
+            if only_changed:
+                row = await q.returning(*[getattr(Payment, key) for key in kwargs]).gino.first()
+                return {key: row[i] for i, key in enumerate(kwargs)} if row else None
+
+            return await q.returning(*Payment).gino.load(Payment).first()
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            return False
+
+    async def claim(self, from_status: int, to_status: int) -> Union[Payment, None]:
+        try:
+            return await Payment.update.values(status=to_status).where(and_(
+                Payment.stripe_invoice_id == self.stripe_invoice_id, Payment.status == from_status
+            )).returning(*Payment).gino.load(Payment).first()
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            return None
+
+
+class DbSearchCursor:
+    STACK_LIMIT = 20
+
+    def __init__(self, company_id: Optional[int] = None, last_seen_id: Optional[int] = None,
+                 stack: Optional[List[int]] = None):
+        self.company_id = company_id
+        self.last_seen_id = last_seen_id
+        self.stack = stack
+
+    async def add(self) -> Union[SearchCursor, bool]:
+        try:
+            target = SearchCursor(
+                company_id=self.company_id, last_seen_id=self.last_seen_id if self.last_seen_id else 0,
+                stack=self.stack if self.stack else []
+            )
+            return await target.create()
+
+        except UniqueViolationError as ex:
+            logger.error(ex)
+            return False
+
+    async def select(self) -> Union[SearchCursor, List[SearchCursor], bool, None]:
+        try:
+            if self.company_id:
+                return await SearchCursor.query.where(SearchCursor.company_id == self.company_id).gino.first()
+
+            else:
+                return await SearchCursor.query.gino.all()
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            return False
+
+    async def get_or_create(self) -> Union[SearchCursor, bool]:
+        target = await self.select()
+        if target:
+            return target
+
+        try:
+            # A concurrent first search may insert the row first, both then read the same cursor
+            await insert(SearchCursor.__table__).values(
+                company_id=self.company_id, last_seen_id=0, stack=[]
+            ).on_conflict_do_nothing(index_elements=[SearchCursor.company_id]).gino.status()
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            return False
+
+        return await self.select()
+
+    async def update(self, **kwargs) -> Union[SearchCursor, bool]:
         try:
             if not kwargs:
                 return False
 
+            values = {"company_id": self.company_id, "last_seen_id": 0, "stack": [], **kwargs}
+            q = insert(SearchCursor.__table__).values(**values).on_conflict_do_update(
+                index_elements=[SearchCursor.company_id], set_=dict(kwargs, updated_at=func.now()))
+            return await q.returning(*SearchCursor).gino.load(SearchCursor).first()
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            return False
+
+    async def move_forward(self, page_last_id: int) -> bool:
+        cursor = await self.get_or_create()
+        stack = (cursor.stack + [cursor.last_seen_id])[-self.STACK_LIMIT:]
+        return await self.update(last_seen_id=page_last_id, stack=stack)
+
+    async def move_back(self) -> bool:
+        cursor = await self.get_or_create()
+        if not cursor.stack:
+            return await self.update(last_seen_id=0)
+
+        return await self.update(last_seen_id=cursor.stack[-1], stack=cursor.stack[:-1])
+
+    async def reset(self) -> bool:
+        return await self.update(last_seen_id=0, stack=[])
+
+    async def remove(self) -> Union[bool, List[bool]]:
+        try:
             target = await self.select()
+            if isinstance(target, list):
+                results = []
+                for i in target:
+                    results.append(await i.delete())
+
+                return results
+
+            elif isinstance(target, SearchCursor):
+                return await target.delete()
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            return False
+
+
+class DbRepricingCheckpoint:
+    def __init__(self, signature: Optional[str] = None):
+        self.signature = signature
+
+    async def select(self) -> Union[RepricingCheckpoint, List[RepricingCheckpoint], bool, None]:
+        try:
+            if self.signature:
+                return await RepricingCheckpoint.query.where(
+                    RepricingCheckpoint.signature == self.signature).gino.first()
+
+            else:
+                return await RepricingCheckpoint.query.gino.all()
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            return False
+
+    async def get_or_create(self) -> Union[RepricingCheckpoint, bool]:
+        target = await self.select()
+        if target:
+            return target
+
+        try:
+            return await RepricingCheckpoint(
+                signature=self.signature, last_driver_id=0, processed=0, changed=0, finished=0).create()
+
+        except UniqueViolationError as ex:
+            logger.error(ex)
+            return False
+
+    async def update(self, **kwargs) -> bool:
+        try:
+            if not kwargs:
+                return False
+
+            target = await self.get_or_create()
             return await target.update(**kwargs).apply()
 
         except Exception:
@@ -16,6 +16,7 @@ class Driver(TimedBaseModel):
 
     stripe_product_id = Column(String)
     stripe_price_id = Column(String)
+    username = Column(String)
 
     name = Column(String, nullable=False)
     birth_year = Column(Integer, nullable=False)
@@ -50,9 +51,6 @@ class Company(TimedBaseModel):
     tg_user_id = Column(BigInteger, nullable=False, primary_key=True)
     lang = Column(String, nullable=False)
     paid_subscription = Column(Integer)
-    viewed_drivers = Column(ARRAY(Integer))
-    saved_drivers = Column(ARRAY(Integer))
-    open_drivers = Column(ARRAY(Integer))
 
     stripe_customer_id = Column(String)
     stripe_subscribe_product_id = Column(String)
@@ -100,3 +98,72 @@ class Payment(TimedBaseModel):
     stripe_invoice_id = Column(String)
 
     query: sql.Select
+
+
+class SearchCursor(TimedBaseModel):
+    __tablename__ = "search_cursors"
+
+    company_id = Column(BigInteger, primary_key=True)
+    last_seen_id = Column(BigInteger, nullable=False, server_default="0")
+    stack = Column(ARRAY(BigInteger), nullable=False, server_default="{}")
+
+    query: sql.Select
+
+
+class RepricingCheckpoint(TimedBaseModel):
+    __tablename__ = "repricing_checkpoints"
+
+    signature = Column(String, primary_key=True)
+    last_driver_id = Column(BigInteger, nullable=False, server_default="0")
+    processed = Column(BigInteger, nullable=False, server_default="0")
+    changed = Column(BigInteger, nullable=False, server_default="0")
+    finished = Column(Integer, nullable=False, server_default="0")
+
+    query: sql.Select
+
+
+class FsmRecord(TimedBaseModel):
+    __tablename__ = "fsm_states"
+
+    key = Column(String, primary_key=True)
+    state = Column(String)
+    data = Column(String)
+
+    query: sql.Select
+
+
+class CleanupMessage(TimedBaseModel):
+    __tablename__ = "cleanup_messages"
+
+    user_id = Column(BigInteger, primary_key=True)
+    message_id = Column(BigInteger, primary_key=True)
+    secondary = Column(Integer, nullable=False, server_default="0")
+
+    query: sql.Select
+
+
+class CompanyDriverSave(TimedBaseModel):
+    __tablename__ = "company_driver_saves"
+
+    company_id = Column(BigInteger, primary_key=True)
+    driver_id = Column(BigInteger, primary_key=True)
+
+    query: sql.Select
+
+
+class CompanyDriverOpen(TimedBaseModel):
+    __tablename__ = "company_driver_opens"
+
+    company_id = Column(BigInteger, primary_key=True)
+    driver_id = Column(BigInteger, primary_key=True)
+
+    query: sql.Select
+
+
+class Counter(TimedBaseModel):
+    __tablename__ = "counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(BigInteger, nullable=False, server_default="0")
+
+    query: sql.Select
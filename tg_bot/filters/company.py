@@ -1,9 +1,13 @@
+from typing import Dict, Union
+
 from aiogram import types
 from aiogram.filters import Filter
 
 from tg_bot.db_models.quick_commands import DbCompany
+from tg_bot.db_models.schemas import Company
 
 
 class IsCompany(Filter):
-    async def __call__(self, message: types.Message) -> bool:
-        return bool(await DbCompany(tg_user_id=message.from_user.id).select())
+    async def __call__(self, message: types.Message) -> Union[bool, Dict[str, Company]]:
+        company = await DbCompany(tg_user_id=message.from_user.id).select()
+        return {"company": company} if company else False
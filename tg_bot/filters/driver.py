@@ -1,9 +1,13 @@
+from typing import Dict, Union
+
 from aiogram import types
 from aiogram.filters import Filter
 
 from tg_bot.db_models.quick_commands import DbDriver
+from tg_bot.db_models.schemas import Driver
 
 
 class IsDriver(Filter):
-    async def __call__(self, message: types.Message) -> bool:
-        return bool(await DbDriver(tg_user_id=message.from_user.id).select())
+    async def __call__(self, message: types.Message) -> Union[bool, Dict[str, Driver]]:
+        driver = await DbDriver(tg_user_id=message.from_user.id).select()
+        return {"driver": driver} if driver else False
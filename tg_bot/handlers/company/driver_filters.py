@@ -1,17 +1,19 @@
 import logging
 import asyncio
-from typing import Union, List, Any
+from typing import Union, List, Any, Optional
 
 from aiogram import Router, types, F
 from aiogram.fsm.context import FSMContext
 
 from config import Config
-from tg_bot.db_models.quick_commands import DbCompany
+from tg_bot.db_models.quick_commands import DbCompany, DbSearchCursor
+from tg_bot.db_models.schemas import Company
 from tg_bot.filters.company import IsCompany
 from tg_bot.handlers.company.menu import show_menu
 from tg_bot.handlers.driver.register_driver import RegistrationSteps
 from tg_bot.misc.models import DriverForm
 from tg_bot.misc.states import CompanyFilters
+from tg_bot.misc.steps import Steps
 from tg_bot.misc.utils import Utils as Ut
 
 logger = logging.getLogger(__name__)
@@ -19,12 +21,13 @@ router = Router()
 
 
 @router.callback_query(IsCompany(), F.data == "filters")
-async def selected_filters_btn(callback: types.CallbackQuery, state: FSMContext):
+async def selected_filters_btn(callback: types.CallbackQuery, state: FSMContext, company: Optional[Company] = None):
     await callback.answer()
     uid = callback.from_user.id
     await Ut.handler_log(logger, uid)
 
-    company = await DbCompany(tg_user_id=uid).select()
+    if company is None:
+        company = await DbCompany(tg_user_id=uid).select()
 
     text_question = await Ut.get_message_text(key="company_filters", lang=company.lang)
     text_form = await DriverForm().form_completion(lang=company.lang, db_model=company)
@@ -86,6 +89,8 @@ async def reset_filters_has_completed(callback: types.CallbackQuery, state: FSMC
         crew=None, driver_gender=None
     )
     if result:
+        await DbSearchCursor(company_id=company.id).reset()
+
         text = await Ut.get_message_text(key="company_reset_filters_completed", lang=company.lang)
         await Ut.send_step_message(user_id=uid, texts=[text])
 
@@ -126,7 +131,8 @@ async def show_param_options(callback: types.CallbackQuery, state: FSMContext):
         return await selected_filters_btn(callback=callback, state=state)
 
     else:
-        await state.update_data(status=2, function_for_back=processing_filters_menu, call_function=param_has_changed)
+        await state.update_data(status=2, function_for_back=Steps.id(processing_filters_menu),
+                                call_function=Steps.id(param_has_changed))
 
         reg_method = getattr(RegistrationSteps, cd)
         await reg_method(state=state, lang=company.lang)
@@ -153,8 +159,10 @@ async def param_has_changed(state: FSMContext, returned_data: Union[str, int, Li
     else:
         params = {field_name: returned_data}
 
-    result = await DbCompany(tg_user_id=uid).update(viewed_drivers=[], **params)
+    result = await DbCompany(tg_user_id=uid).update(**params)
     if result:
+        await DbSearchCursor(company_id=company.id).reset()
+
         text = await Ut.get_message_text(key="company_filters_param_changed", lang=company.lang)
         await Ut.send_step_message(user_id=uid, texts=[text])
 
@@ -165,3 +173,5 @@ async def param_has_changed(state: FSMContext, returned_data: Union[str, int, Li
         text = await Ut.get_message_text(key="company_filters_error_filter_params_changed", lang=company.lang)
         msg = await Config.BOT.send_message(chat_id=uid, text=text)
         await Ut.add_msg_to_delete(user_id=uid, msg_id=msg.message_id)
+
+Steps.register_many({"df.processing_filters_menu": processing_filters_menu, "df.param_has_changed": param_has_changed})
@@ -1,15 +1,16 @@
 import asyncio
 import logging
-from copy import deepcopy
 
 from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
 
-from tg_bot.db_models.quick_commands import DbCompany, DbDriver
+from config import Config
+from tg_bot.db_models.quick_commands import DbCompany, DbDriver, DbSearchCursor
 from tg_bot.handlers.company.menu import show_menu
 from tg_bot.handlers.company.payments_processing import PaymentsProcessing
 from tg_bot.keyboards.inline import CustomInlineMarkups as Cim, ActionOnDriver, ActionsAfterBtnOpen, MenuBeforeForm
-from tg_bot.misc.models import DriverForm
+from tg_bot.misc.cards import DriverCards
+from tg_bot.misc.steps import Steps
 from tg_bot.misc.utils import Utils as Ut
 
 logger = logging.getLogger(__name__)
@@ -41,21 +42,24 @@ async def show_driver(callback: types.CallbackQuery, retry: bool = False):
         "crew": company.crew, "driver_gender": company.driver_gender, "status": 1
     })
 
-    viewed_drivers_id = deepcopy(company.viewed_drivers)
-    viewed_drivers_id.extend(company.open_drivers)
+    cursor = await DbSearchCursor(company_id=company.id).get_or_create()
 
     db_driver = DbDriver(**params)
-    drivers = await db_driver.select(viewed_drivers_id=viewed_drivers_id)
+    drivers, total_count, count_capped = await db_driver.search(
+        opened_by=company.id, last_seen_id=cursor.last_seen_id,
+        count_mode=DbDriver.COUNT_CAPPED if Config.SEARCH_COUNT_LIMIT else DbDriver.COUNT_EXACT,
+        count_limit=Config.SEARCH_COUNT_LIMIT
+    )
 
     if not drivers:
-        if retry and len(company.viewed_drivers) > 0:
+        if retry and cursor.last_seen_id > 0:
             text = await Ut.get_message_text(lang=company.lang, key="company_find_driver_end")
             await Ut.send_step_message(user_id=uid, texts=[text])
             await asyncio.sleep(1.5)
 
-            await DbCompany(tg_user_id=uid).update(viewed_drivers=[])
+            await DbSearchCursor(company_id=company.id).reset()
 
-        elif retry and len(company.viewed_drivers) == 0:
+        elif retry and cursor.last_seen_id == 0:
             text = await Ut.get_message_text(lang=company.lang, key="company_drivers_list_none")
             await Ut.send_step_message(user_id=uid, texts=[text])
             await asyncio.sleep(1.5)
@@ -68,22 +72,17 @@ async def show_driver(callback: types.CallbackQuery, retry: bool = False):
     markup_info_before_open = await Cim.company_driver_menu_before_form(
         lang=company.lang, current_drivers=[str(d.id) for d in drivers])
 
-    await Ut.send_step_message(user_id=uid, texts=[text_info_before_open], markups=[markup_info_before_open])
+    # Cards are rendered while the header is on its way
+    _, cards = await asyncio.gather(
+        Ut.send_step_message(user_id=uid, texts=[text_info_before_open], markups=[markup_info_before_open]),
+        asyncio.gather(*[DriverCards.company_card(driver=driver, lang=company.lang) for driver in drivers])
+    )
 
-    for driver in drivers:
-        text_driver = await Ut.get_message_text(lang=company.lang, key="company_driver_found")
-        text_driver = text_driver.replace("%driver_id%", str(driver.id))
-        text_driver = text_driver.replace("%driver_price%", str(driver.form_price))
-        text_driver += "\n\n" + await DriverForm().form_completion(lang=company.lang, db_model=driver, for_company=True)
-        markup = await Cim.find_driver_menu(lang=company.lang, driver_id=driver.id)
-        msg = await callback.message.answer(text=text_driver, reply_markup=markup)
-        await Ut.add_msg_to_delete(user_id=uid, msg_id=msg.message_id)
-
-    count_drivers = (await db_driver.select(viewed_drivers_id=viewed_drivers_id, count_records=True)) - 3
+    count_drivers = max(total_count - len(drivers), 0)
     text = await Ut.get_message_text(lang=company.lang, key="company_text_after_driver_form")
-    text = text.replace("%drivers_count%", str(count_drivers if count_drivers >= 0 else 0))
-    msg = await callback.message.answer(text=text, reply_markup=markup_info_before_open)
-    await Ut.add_msg_to_delete(user_id=uid, msg_id=msg.message_id)
+    # Past the cap only a lower bound is known
+    text = text.replace("%drivers_count%", f"{count_drivers}+" if count_capped else str(count_drivers))
+    await Ut.send_ordered_messages(user_id=uid, messages=[*cards, (text, markup_info_before_open)])
 
 
 @router.callback_query(ActionOnDriver.filter(F.action == "save"))
@@ -94,20 +93,14 @@ async def save_driver(callback: types.CallbackQuery, callback_data: ActionOnDriv
 
     company = await DbCompany(tg_user_id=uid).select()
 
-    if callback_data.driver_id in company.saved_drivers:
-        text = await Ut.get_message_text(lang=company.lang, key="company_driver_already_saved")
+    if await DbCompany(db_id=company.id).add_driver(relation=DbCompany.SAVED, driver_id=callback_data.driver_id):
+        text = await Ut.get_message_text(lang=company.lang, key="company_driver_save")
 
     else:
-        company.saved_drivers.append(callback_data.driver_id)
-        await DbCompany(tg_user_id=uid).update(saved_drivers=company.saved_drivers)
-        text = await Ut.get_message_text(lang=company.lang, key="company_driver_save")
+        text = await Ut.get_message_text(lang=company.lang, key="company_driver_already_saved")
 
     driver = await DbDriver(db_id=callback_data.driver_id).select()
-    text_driver = await Ut.get_message_text(lang=company.lang, key="company_driver_found")
-    text_driver = text_driver.replace("%driver_id%", str(driver.id))
-    text_driver = text_driver.replace("%driver_price%", str(driver.form_price))
-    text_driver += "\n\n" + await DriverForm().form_completion(lang=company.lang, db_model=driver, for_company=True)
-    markup = await Cim.find_driver_menu(lang=company.lang, driver_id=driver.id)
+    text_driver, markup = await DriverCards.company_card(driver=driver, lang=company.lang)
 
     text += "\n\n" + text_driver
 
@@ -166,11 +159,7 @@ async def back_to_form(callback: types.CallbackQuery, callback_data: ActionsAfte
     company = await DbCompany(tg_user_id=uid).select()
 
     driver = await DbDriver(db_id=int(callback_data.driver_id)).select()
-    text_driver = await Ut.get_message_text(lang=company.lang, key="company_driver_found")
-    text_driver = text_driver.replace("%driver_id%", str(driver.id))
-    text_driver = text_driver.replace("%driver_price%", str(driver.form_price))
-    text_driver += "\n\n" + await DriverForm().form_completion(lang=company.lang, db_model=driver, for_company=True)
-    markup = await Cim.find_driver_menu(lang=company.lang, driver_id=driver.id)
+    text_driver, markup = await DriverCards.company_card(driver=driver, lang=company.lang)
 
     await callback.message.edit_text(text=text_driver, reply_markup=markup, disable_web_page_preview=True)
 
@@ -184,16 +173,13 @@ async def open_with_subscribe_confirmation(callback: types.CallbackQuery, callba
     company = await DbCompany(tg_user_id=uid).select()
 
     driver = await DbDriver(db_id=int(callback_data.data)).select()
-    company.open_drivers.append(driver.id)
-    if driver.id in company.saved_drivers:
-        company.saved_drivers.remove(driver.id)
+    result = await DbCompany(db_id=company.id).open_driver(driver_id=driver.id, use_subscription=True)
+    if not result or ((not result[0]) and (result[2] is None)):
+        # Subscription opens are over, the company is offered to pay for the driver
+        return await open_driver(callback=callback, callback_data=ActionOnDriver(action="open", driver_id=driver.id))
 
-    await DbCompany(db_id=company.id).update(
-        open_drivers=company.open_drivers, saved_drivers=company.saved_drivers)
-
-    await DbDriver(db_id=driver.id).update(opens_count=driver.opens_count + 1)
     text = await Ut.get_message_text(lang=company.lang, key="pay_for_driver_success")
-    text += "\n\n" + await DriverForm().form_completion(lang=company.lang, db_model=driver)
+    text += "\n\n" + await DriverCards.form_text(driver=driver, lang=company.lang)
 
     msg = await callback.message.edit_text(text=text, reply_markup=None, disable_web_page_preview=True)
     await Ut.add_msg_to_delete(user_id=uid, msg_id=msg.message_id)
@@ -210,7 +196,7 @@ async def payment_system_selected(callback: types.CallbackQuery, state: FSMConte
     text = await Ut.get_message_text(lang=company.lang, key="payment_in_creating_process")
     await Ut.send_step_message(user_id=uid, texts=[text])
 
-    await state.update_data(function_for_back=show_driver, type="open_driver",
+    await state.update_data(function_for_back=Steps.id(show_driver), type="open_driver",
                             current_driver_id=int(callback_data.driver_id))
 
     payment_method = getattr(PaymentsProcessing, callback_data.additional_data)
@@ -226,13 +212,15 @@ async def pagination(callback: types.CallbackQuery, callback_data: MenuBeforeFor
     company = await DbCompany(tg_user_id=uid).select()
 
     if callback_data.action == "next":
-        company.viewed_drivers.extend(list(map(int, callback_data.drivers.split(','))))
+        page_last_id = max(map(int, callback_data.drivers.split(',')))
+        await DbSearchCursor(company_id=company.id).move_forward(page_last_id=page_last_id)
 
     elif callback_data.action == "previous":
-        company.viewed_drivers = company.viewed_drivers[:-3]
+        await DbSearchCursor(company_id=company.id).move_back()
 
     else:
         return
 
-    await DbCompany(db_id=company.id).update(viewed_drivers=company.viewed_drivers)
     await show_driver(callback=callback)
+
+Steps.register("fd.show_driver", show_driver)
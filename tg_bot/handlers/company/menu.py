@@ -26,7 +26,7 @@ async def show_menu(message: Union[types.Message, types.CallbackQuery], state: O
         await message.answer()
 
     company = await DbCompany(tg_user_id=uid).select()
-    forms_count = len(await DbDriver(status=1).select())
+    forms_count = await DbDriver.count_active_forms()
     text = await Ut.get_message_text(key="company_menu_text", lang=company.lang)
     text = text.replace("%forms_count%", str(forms_count))
 
@@ -39,7 +39,7 @@ async def add_company_to_db(callback: types.CallbackQuery, state: FSMContext):
 
     cd = callback.data
     if cd == "start_search":
-        company = await DbCompany(tg_user_id=uid, lang=ulang, paid_subscription=None, viewed_drivers=[]).add()
+        company = await DbCompany(tg_user_id=uid, lang=ulang, paid_subscription=None).add()
         if not company:
             text = await Ut.get_message_text(lang=ulang, key="company_add_to_db_error")
             msg = await callback.message.answer(text=text)
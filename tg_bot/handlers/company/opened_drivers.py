@@ -1,13 +1,15 @@
 import asyncio
 import logging
 from math import ceil
+from typing import Tuple
 
 from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
 
-from tg_bot.db_models.quick_commands import DbCompany, DbDriver
+from tg_bot.db_models.quick_commands import DbCompany
+from tg_bot.db_models.schemas import Driver
 from tg_bot.handlers.company.menu import show_menu
-from tg_bot.misc.models import DriverForm
+from tg_bot.misc.cards import DriverCards
 from tg_bot.misc.states import CompanyOpenedDrivers
 from tg_bot.misc.utils import Utils as Ut
 
@@ -28,14 +30,15 @@ async def show_opened_drivers(callback: types.CallbackQuery, state: FSMContext):
         return await show_menu(message=callback)
 
     company = await DbCompany(tg_user_id=uid).select()
-    if not company.open_drivers:
+    opened_count = await DbCompany(db_id=company.id).count_drivers(relation=DbCompany.OPENED)
+    if not opened_count:
         text = await Ut.get_message_text(lang=company.lang, key="no_opened_drivers")
         await Ut.send_step_message(user_id=uid, texts=[text])
         await asyncio.sleep(1.5)
         return await show_menu(message=callback)
 
     data = await state.get_data()
-    num_of_pages = data["num_of_pages"] if data.get("num_of_pages") else ceil(len(company.open_drivers) / 3)
+    num_of_pages = data["num_of_pages"] if data.get("num_of_pages") else ceil(opened_count / 3)
     curr_page = data.get("curr_page")
     if curr_page is None:
         curr_page = 1
@@ -60,17 +63,16 @@ async def show_opened_drivers(callback: types.CallbackQuery, state: FSMContext):
     text_your_drivers = text_your_drivers.replace("%num_of_pages%", str(num_of_pages))
     markup = await Ut.get_markup(mtype="inline", lang=company.lang, key="saved_and_opened_drivers_menu")
 
-    drivers_texts = []
-    start_index = 3 * (curr_page - 1)
-    for driver_id in company.open_drivers[start_index:start_index + 3]:
-        driver = await DbDriver(db_id=driver_id).select()
+    async def driver_card(driver: Driver) -> Tuple[str, None]:
         title = f"<b>🆔 Водитель №{driver.id}</b>"
-        d_text = title + "\n" + await DriverForm().form_completion(lang=company.lang, db_model=driver)
-        drivers_texts.append(d_text)
+        return title + "\n" + await DriverCards.form_text(driver=driver, lang=company.lang), None
 
-    await Ut.send_step_message(user_id=uid, texts=[text_your_drivers], markups=[markup])
-    for d_text in drivers_texts:
-        msg = await callback.message.answer(text=d_text)
-        await Ut.add_msg_to_delete(user_id=uid, msg_id=msg.message_id)
+    drivers = await DbCompany(db_id=company.id).drivers_page(relation=DbCompany.OPENED, offset=3 * (curr_page - 1))
+
+    _, drivers_texts = await asyncio.gather(
+        Ut.send_step_message(user_id=uid, texts=[text_your_drivers], markups=[markup]),
+        asyncio.gather(*[driver_card(driver=driver) for driver in drivers])
+    )
+    await Ut.send_ordered_messages(user_id=uid, messages=drivers_texts)
 
     await state.set_state(CompanyOpenedDrivers.Actions)
@@ -1,6 +1,8 @@
 import asyncio
 import logging
+import traceback
 from datetime import datetime
+from typing import List, Optional
 
 import stripe
 from aiogram import types, Router
@@ -9,18 +11,25 @@ from aiogram.fsm.context import FSMContext
 from stripe.oauth_error import InvalidRequestError
 
 from config import Config
-from tg_bot.db_models.db_gino import connect_to_db
+from tg_bot.db_models.db_gino import connect_to_db, db
 from tg_bot.db_models.quick_commands import DbDriver, DbPayment, DbCompany
 from tg_bot.db_models.schemas import Payment
 from tg_bot.keyboards.inline import CustomInlineMarkups as Cim
-from tg_bot.misc.models import DriverForm
+from tg_bot.misc.cards import DriverCards
+from tg_bot.misc.invoice_poller import InvoicePoller
 from tg_bot.misc.states import CompanyFindDriver
+from tg_bot.misc.steps import Steps
+from tg_bot.misc.stripe_webhook import StripeWebhook
 from tg_bot.misc.utils import Utils as Ut
 
 logger = logging.getLogger(__name__)
 router = Router()
 
 
+class PaymentNotApplied(Exception):
+    pass
+
+
 class PaymentsProcessing:
     STRIPE = "stripe"
     CRYPTOMUS = "cryptomus"
@@ -129,79 +138,153 @@ class PaymentsProcessing:
             await callback.message.answer(text=text)
 
     @staticmethod
-    async def stripe_handling():
-        logging.getLogger("aiogram.event").setLevel(logging.WARNING)
-        logging.basicConfig(level=logging.INFO,
-                            format=u'%(filename)s:%(lineno)d #%(levelname)-8s [%(asctime)s] - %(name)s - %(message)s')
+    async def delete_payment_message(payment: Payment):
+        try:
+            await Config.BOT.delete_message(chat_id=payment.creator_id, message_id=payment.msg_to_delete)
 
-        logger.info(f"Handling stripe payments has started!")
-        await connect_to_db(remove_data=False)
-        await Ut.load_localizations_files()
+        except TelegramBadRequest:
+            pass
 
-        stripe.api_key = Config.STRIPE_SECRET_KEY
-        while True:
-            await asyncio.sleep(5)
+    @staticmethod
+    async def stripe_invoice_paid(stripe_invoice_id: str) -> bool:
+        # The claim is committed together with the purchase. If the purchase can not be applied, the claim is rolled
+        # back and the payment stays pending for the retried Stripe event and the poller
+        driver = None
+        async with db.transaction():
+            payment = await DbPayment(stripe_invoice_id=stripe_invoice_id).claim(from_status=0, to_status=1)
+            if not payment:
+                return False
+
+            company = await DbCompany(tg_user_id=payment.creator_id).select()
+            if not company:
+                raise PaymentNotApplied(f"Company is not found. payment_id={payment.id}")
+
+            if payment.type == PaymentsProcessing.PAY_FOR_DRIVER:
+                driver = await DbDriver(db_id=payment.driver_id).select()
+                if not driver:
+                    raise PaymentNotApplied(f"Driver is not found. payment_id={payment.id}")
+
+                if not await DbCompany(db_id=company.id).open_driver(driver_id=driver.id):
+                    raise PaymentNotApplied(f"Driver is not opened. payment_id={payment.id}")
+
+            elif payment.type == PaymentsProcessing.SUBSCRIPTION_FEE:
+                if not await DbCompany(db_id=company.id).update(paid_subscription=20):
+                    raise PaymentNotApplied(f"Subscription is not updated. payment_id={payment.id}")
 
-            db_payments = await DbPayment(
-                system=PaymentsProcessing.STRIPE, status=0).select(status_with_selected_system=True)
-            for payment in db_payments:
-                invoice_obj: stripe.Invoice = await stripe.Invoice.retrieve_async(payment.stripe_invoice_id)
-                if invoice_obj.status == "paid":
-                    await DbPayment(db_id=payment.id).update(status=1)
+            else:
+                # A retry can not apply an unknown type either, the payment stays claimed
+                logger.error(f"Unknown payment type. payment_id={payment.id}; type={payment.type}")
+                return False
 
-                    company = await DbCompany(tg_user_id=payment.creator_id).select()
-                    if payment.type == PaymentsProcessing.PAY_FOR_DRIVER:
-                        driver = await DbDriver(db_id=payment.driver_id).select()
-                        company.open_drivers.append(payment.driver_id)
-                        if driver.id in company.saved_drivers:
-                            company.saved_drivers.remove(driver.id)
+        try:
+            if driver:
+                text_question = await Ut.get_message_text(lang=company.lang, key="pay_for_driver_success")
+                text_form = await DriverCards.form_text(driver=driver, lang=company.lang)
+                text = text_question + "\n" + text_form
 
-                        await DbCompany(db_id=company.id).update(
-                            open_drivers=company.open_drivers, saved_drivers=company.saved_drivers)
+            else:
+                text = await Ut.get_message_text(lang=company.lang, key="pay_for_subscription_success")
 
-                        await DbDriver(db_id=driver.id).update(opens_count=driver.opens_count + 1)
-                        text_question = await Ut.get_message_text(lang=company.lang, key="pay_for_driver_success")
-                        text_form = await DriverForm().form_completion(lang=company.lang, db_model=driver)
-                        text = text_question + "\n" + text_form
+            text_payment_success = await Ut.get_message_text(lang=company.lang, key="payment_success")
 
-                    elif payment.type == PaymentsProcessing.SUBSCRIPTION_FEE:
-                        await DbCompany(db_id=company.id).update(paid_subscription=20)
-                        text = await Ut.get_message_text(lang=company.lang, key="pay_for_subscription_success")
+            await PaymentsProcessing.delete_payment_message(payment=payment)
+            await Config.BOT.send_message(chat_id=payment.creator_id, text=text_payment_success)
+            await Config.BOT.send_message(chat_id=payment.creator_id, text=text)
 
-                    else:
-                        return
+            if driver:
+                text = await Ut.get_message_text(lang=driver.lang, key="msg_to_driver_after_open")
 
-                    text_payment_success = await Ut.get_message_text(lang=company.lang, key="payment_success")
+                try:
+                    await Config.BOT.send_message(chat_id=driver.tg_user_id, text=text)
 
-                    try:
-                        await Config.BOT.delete_message(chat_id=payment.creator_id, message_id=payment.msg_to_delete)
+                except TelegramBadRequest:
+                    pass
 
-                    except TelegramBadRequest:
-                        pass
+        except Exception:
+            # The payment is already applied, a failed notification must not make Stripe retry it
+            logger.error(traceback.format_exc())
 
-                    await Config.BOT.send_message(chat_id=payment.creator_id, text=text_payment_success)
-                    await Config.BOT.send_message(chat_id=payment.creator_id, text=text)
+        return True
 
-                    if payment.type == PaymentsProcessing.PAY_FOR_DRIVER:
-                        text = await Ut.get_message_text(lang=driver.lang, key="msg_to_driver_after_open")
+    @staticmethod
+    async def stripe_invoice_voided(stripe_invoice_id: str) -> bool:
+        # Cancellation from the bot marks the payment before voiding the invoice, so only external voids get here
+        payment = await DbPayment(stripe_invoice_id=stripe_invoice_id).claim(from_status=0, to_status=2)
+        if not payment:
+            return False
 
-                        try:
-                            await Config.BOT.send_message(chat_id=driver.tg_user_id, text=text)
+        company = await DbCompany(tg_user_id=payment.creator_id).select()
+        text = await Ut.get_message_text(lang=company.lang, key="payment_cancel_complete")
 
-                        except TelegramBadRequest:
-                            pass
+        await PaymentsProcessing.delete_payment_message(payment=payment)
+        await Config.BOT.send_message(chat_id=company.tg_user_id, text=text)
+        return True
 
-                elif invoice_obj.status == "open":
-                    due_date_dt = datetime.fromtimestamp(invoice_obj.due_date, Config.TIMEZONE)
-                    current_dt = datetime.now(tz=Config.TIMEZONE)
-                    if current_dt > due_date_dt:
-                        await DbPayment(db_id=payment.id).update(status=2)
+    @staticmethod
+    async def stripe_invoice_expired(stripe_invoice_id: str) -> bool:
+        payment = await DbPayment(stripe_invoice_id=stripe_invoice_id).claim(from_status=0, to_status=2)
+        if not payment:
+            return False
+
+        company = await DbCompany(tg_user_id=payment.creator_id).select()
+        text = await Ut.get_message_text(lang=company.lang, key="payment_due_time")
 
-                        company = await DbCompany(tg_user_id=payment.creator_id).select()
-                        text = await Ut.get_message_text(lang=company.lang, key="payment_due_time")
+        await PaymentsProcessing.delete_payment_message(payment=payment)
+        await Config.BOT.send_message(chat_id=company.tg_user_id, text=text)
+        return True
+
+    @staticmethod
+    async def stripe_pending_payments() -> List[Payment]:
+        payments = await DbPayment(
+            system=PaymentsProcessing.STRIPE, status=0).select(status_with_selected_system=True)
+        return payments if payments else []
 
-                        await Config.BOT.delete_message(chat_id=payment.creator_id, message_id=payment.msg_to_delete)
-                        await Config.BOT.send_message(chat_id=company.tg_user_id, text=text)
+    @staticmethod
+    async def stripe_check_payment(payment: Payment) -> Optional[float]:
+        invoice_obj: stripe.Invoice = await stripe.Invoice.retrieve_async(payment.stripe_invoice_id)
+        if invoice_obj.status == "paid":
+            await PaymentsProcessing.stripe_invoice_paid(stripe_invoice_id=payment.stripe_invoice_id)
+
+        elif invoice_obj.status == "void":
+            await PaymentsProcessing.stripe_invoice_voided(stripe_invoice_id=payment.stripe_invoice_id)
+
+        elif invoice_obj.status == "open":
+            due_date_dt = datetime.fromtimestamp(invoice_obj.due_date, Config.TIMEZONE)
+            current_dt = datetime.now(tz=Config.TIMEZONE)
+            if current_dt > due_date_dt:
+                await PaymentsProcessing.stripe_invoice_expired(stripe_invoice_id=payment.stripe_invoice_id)
+
+            else:
+                return float(invoice_obj.due_date)
+
+    @staticmethod
+    async def stripe_handling():
+        logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+        logging.basicConfig(level=logging.INFO,
+                            format=u'%(filename)s:%(lineno)d #%(levelname)-8s [%(asctime)s] - %(name)s - %(message)s')
+
+        logger.info(f"Handling stripe payments has started!")
+        await connect_to_db(remove_data=False, name="stripe", max_size=Config.DB_WORKER_POOL_MAX_SIZE)
+        await Ut.load_localizations_files()
+
+        stripe.api_key = Config.STRIPE_SECRET_KEY
+
+        min_interval, max_interval = Config.STRIPE_POLL_MIN_INTERVAL, Config.STRIPE_POLL_MAX_INTERVAL
+        if Config.STRIPE_WEBHOOK_SECRET:
+            webhook = StripeWebhook(secret=Config.STRIPE_WEBHOOK_SECRET, handlers={
+                "invoice.paid": PaymentsProcessing.stripe_invoice_paid,
+                "invoice.voided": PaymentsProcessing.stripe_invoice_voided,
+            })
+            await webhook.start(
+                host=Config.STRIPE_WEBHOOK_HOST, port=Config.STRIPE_WEBHOOK_PORT, path=Config.STRIPE_WEBHOOK_PATH)
+            min_interval = max_interval = Config.STRIPE_SWEEP_INTERVAL
+
+        poller = InvoicePoller(
+            check=PaymentsProcessing.stripe_check_payment, load_pending=PaymentsProcessing.stripe_pending_payments,
+            min_interval=min_interval, max_interval=max_interval, concurrency=Config.STRIPE_POLL_CONCURRENCY,
+            rate=Config.STRIPE_POLL_RATE
+        )
+        await poller.run()
 
     @staticmethod
     async def cryptomus(callback: types.CallbackQuery, state: FSMContext):
@@ -214,7 +297,7 @@ class PaymentsProcessing:
                             format=u'%(filename)s:%(lineno)d #%(levelname)-8s [%(asctime)s] - %(name)s - %(message)s')
 
         logger.info(f"Handling cryptomus payments has started!")
-        await connect_to_db(remove_data=False)
+        await connect_to_db(remove_data=False, name="cryptomus", max_size=Config.DB_WORKER_POOL_MAX_SIZE)
         await Ut.load_localizations_files()
 
     @staticmethod
@@ -272,7 +355,7 @@ class PaymentsProcessing:
             await Ut.send_step_message(user_id=uid, texts=[text])
             await asyncio.sleep(1.5)
 
-            await data["function_for_back"](callback=callback)
+            await Steps.get(data["function_for_back"])(callback=callback)
 
 
 router.callback_query.register(PaymentsProcessing.payments_handler, CompanyFindDriver.PaymentProcessing)
@@ -4,7 +4,8 @@ import logging
 from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
 
-from tg_bot.db_models.quick_commands import DbCompany
+from tg_bot.db_models.quick_commands import DbCompany, DbSearchCursor
+from tg_bot.db_models.schemas import Company
 from tg_bot.filters.company import IsCompany
 from tg_bot.handlers.company.menu import show_menu
 from tg_bot.handlers.start import choose_language
@@ -16,13 +17,11 @@ router = Router()
 
 
 @router.callback_query(F.data == "remove_company_profile", IsCompany())
-async def remove_profile_confirmation(callback: types.CallbackQuery, state: FSMContext):
+async def remove_profile_confirmation(callback: types.CallbackQuery, state: FSMContext, company: Company):
     await callback.answer()
     uid = callback.from_user.id
     await Ut.handler_log(logger, uid)
 
-    company = await DbCompany(tg_user_id=uid).select()
-
     text = await Ut.get_message_text(lang=company.lang, key="company_remove_my_profile_confirmation")
     markup = await Ut.get_markup(mtype="inline", lang=company.lang, key="confirmation")
     await Ut.send_step_message(user_id=uid, texts=[text], markups=[markup])
@@ -44,6 +43,8 @@ async def remove_has_been_confirmed(callback: types.CallbackQuery, state: FSMCon
     company = await DbCompany(tg_user_id=uid).select()
     result = await DbCompany(tg_user_id=uid).remove()
     if result:
+        await DbSearchCursor(company_id=company.id).remove()
+
         text = await Ut.get_message_text(lang=company.lang, key="company_remove_my_profile_success")
         await Ut.send_step_message(user_id=uid, texts=[text])
         await asyncio.sleep(1.5)
@@ -1,17 +1,20 @@
 import logging
 import asyncio
 from math import ceil
-from typing import Optional
+from typing import Optional, Tuple
 
 from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
+from aiogram.types import InlineKeyboardMarkup
 
 from tg_bot.db_models.quick_commands import DbCompany, DbDriver
+from tg_bot.db_models.schemas import Driver
 from tg_bot.handlers.company.menu import show_menu
 from tg_bot.handlers.company.payments_processing import PaymentsProcessing
 from tg_bot.keyboards.inline import CustomInlineMarkups as Cim, SavedDriver
-from tg_bot.misc.models import DriverForm
+from tg_bot.misc.cards import DriverCards
 from tg_bot.misc.states import CompanySavedDrivers
+from tg_bot.misc.steps import Steps
 from tg_bot.misc.utils import Utils as Ut
 
 logger = logging.getLogger(__name__)
@@ -33,14 +36,15 @@ async def show_saved_drivers(callback: types.CallbackQuery, state: FSMContext, f
         return await show_menu(message=callback)
 
     company = await DbCompany(tg_user_id=uid).select()
-    if not company.saved_drivers:
+    saved_count = await DbCompany(db_id=company.id).count_drivers(relation=DbCompany.SAVED)
+    if not saved_count:
         text = await Ut.get_message_text(lang=company.lang, key="no_saved_drivers")
         await Ut.send_step_message(user_id=uid, texts=[text])
         await asyncio.sleep(1.5)
         return await show_menu(message=callback)
 
     data = await state.get_data()
-    num_of_pages = data["num_of_pages"] if data.get("num_of_pages") else ceil(len(company.saved_drivers) / 3)
+    num_of_pages = data["num_of_pages"] if data.get("num_of_pages") else ceil(saved_count / 3)
     curr_page = data.get("curr_page")
     if curr_page is None:
         curr_page = 1
@@ -65,21 +69,19 @@ async def show_saved_drivers(callback: types.CallbackQuery, state: FSMContext, f
     text_your_drivers = text_your_drivers.replace("%num_of_pages%", str(num_of_pages))
     markup = await Ut.get_markup(mtype="inline", lang=company.lang, key="saved_and_opened_drivers_menu")
 
-    drivers_texts = []
-    start_index = 3 * (curr_page - 1)
-    for driver_id in company.saved_drivers[start_index:start_index + 3]:
-        driver = await DbDriver(db_id=driver_id).select()
+    async def driver_card(driver: Driver) -> Tuple[str, InlineKeyboardMarkup]:
         title = f"<b>🆔 Водитель №{driver.id}</b>"
-        d_text = await DriverForm().form_completion(lang=company.lang, db_model=driver, for_company=True)
-        d_text = title + "\n\n" + d_text
-        d_markup = await Cim.saved_driver_menu(driver_id=driver_id, lang=company.lang)
-        drivers_texts.append([d_text, d_markup])
+        d_text = await DriverCards.form_text(driver=driver, lang=company.lang, for_company=True)
+        d_markup = await Cim.saved_driver_menu(driver_id=driver.id, lang=company.lang)
+        return title + "\n\n" + d_text, d_markup
 
-    await Ut.send_step_message(user_id=uid, texts=[text_your_drivers], markups=[markup])
-    for msg_data in drivers_texts:
-        d_text, d_markup = msg_data
-        msg = await callback.message.answer(text=d_text, reply_markup=d_markup)
-        await Ut.add_msg_to_delete(user_id=uid, msg_id=msg.message_id)
+    drivers = await DbCompany(db_id=company.id).drivers_page(relation=DbCompany.SAVED, offset=3 * (curr_page - 1))
+
+    _, drivers_texts = await asyncio.gather(
+        Ut.send_step_message(user_id=uid, texts=[text_your_drivers], markups=[markup]),
+        asyncio.gather(*[driver_card(driver=driver) for driver in drivers])
+    )
+    await Ut.send_ordered_messages(user_id=uid, messages=drivers_texts)
 
     await state.set_state(CompanySavedDrivers.Actions)
 
@@ -114,11 +116,10 @@ async def remove_driver_from_saved_list(callback: types.CallbackQuery, state: FS
         curr_page = data["curr_page"]
 
         company = await DbCompany(tg_user_id=uid).select()
-        company.saved_drivers.remove(current_driver_id)
-        num_of_pages = ceil(len(company.saved_drivers) / 3)
+        await DbCompany(db_id=company.id).remove_driver(relation=DbCompany.SAVED, driver_id=current_driver_id)
+        num_of_pages = ceil(await DbCompany(db_id=company.id).count_drivers(relation=DbCompany.SAVED) / 3)
         await state.update_data(
             num_of_pages=num_of_pages, curr_page=curr_page if curr_page <= num_of_pages else num_of_pages)
-        await DbCompany(db_id=company.id).update(saved_drivers=company.saved_drivers)
 
         text = await Ut.get_message_text(key="driver_remove_from_notes_confirm", lang=company.lang)
         await Ut.send_step_message(user_id=uid, texts=[text])
@@ -179,16 +180,13 @@ async def open_driver_subscribe_confirmation(callback: types.CallbackQuery, stat
         company = await DbCompany(tg_user_id=uid).select()
         driver = await DbDriver(db_id=current_driver_id).select()
 
-        company.open_drivers.append(current_driver_id)
-        if driver.id in company.saved_drivers:
-            company.saved_drivers.remove(driver.id)
-
-        await DbCompany(db_id=company.id).update(
-            open_drivers=company.open_drivers, saved_drivers=company.saved_drivers)
+        result = await DbCompany(db_id=company.id).open_driver(driver_id=driver.id, use_subscription=True)
+        if not result or ((not result[0]) and (result[2] is None)):
+            # Subscription opens are over, the company is offered to pay for the driver
+            return await driver_open(callback=callback, state=state)
 
-        await DbDriver(db_id=driver.id).update(opens_count=driver.opens_count + 1)
         text_question = await Ut.get_message_text(lang=company.lang, key="pay_for_driver_success")
-        text_form = await DriverForm().form_completion(lang=company.lang, db_model=driver)
+        text_form = await DriverCards.form_text(driver=driver, lang=company.lang)
         await Ut.send_step_message(user_id=uid, texts=[text_form, text_question])
 
 
@@ -207,7 +205,9 @@ async def call_payment_method(callback: types.CallbackQuery, state: FSMContext):
     text = await Ut.get_message_text(lang=company.lang, key="payment_in_creating_process")
     await Ut.send_step_message(user_id=uid, texts=[text])
 
-    await state.update_data(function_for_back=driver_open, type="open_driver")
+    await state.update_data(function_for_back=Steps.id(driver_open), type="open_driver")
 
     payment_method = getattr(PaymentsProcessing, cd)
     await payment_method(callback=callback, state=state)
+
+Steps.register("sd.driver_open", driver_open)
@@ -7,6 +7,7 @@ from tg_bot.db_models.quick_commands import DbCompany
 from tg_bot.handlers.company.menu import show_menu
 from tg_bot.handlers.company.payments_processing import PaymentsProcessing
 from tg_bot.misc.states import CompanySubscription
+from tg_bot.misc.steps import Steps
 from tg_bot.misc.utils import Utils as Ut, AdditionalButtons
 
 logger = logging.getLogger(__name__)
@@ -52,7 +53,9 @@ async def call_payment_method(callback: types.CallbackQuery, state: FSMContext):
     text = await Ut.get_message_text(lang=company.lang, key="payment_in_creating_process")
     await Ut.send_step_message(user_id=uid, texts=[text])
 
-    await state.update_data(function_for_back=show_subscription_info, type="subscribe")
+    await state.update_data(function_for_back=Steps.id(show_subscription_info), type="subscribe")
 
     payment_method = getattr(PaymentsProcessing, cd)
     await payment_method(callback=callback, state=state)
+
+Steps.register("sub.show_subscription_info", show_subscription_info)
@@ -15,7 +15,7 @@ async def change_status(callback: types.CallbackQuery):
     uid = callback.from_user.id
     await Ut.handler_log(logger, uid)
 
-    forms_count = len(await DbDriver(status=1).select())
+    forms_count = await DbDriver.count_active_forms()
     driver = await DbDriver(tg_user_id=uid).select()
     new_status = int(not bool(driver.status))
     await DbDriver(tg_user_id=uid).update(status=new_status)
@@ -10,8 +10,10 @@ from config import Config
 from tg_bot.db_models.quick_commands import DbDriver
 from tg_bot.handlers.driver.menu import show_menu
 from tg_bot.handlers.driver.register_driver import RegistrationSteps
+from tg_bot.misc.cards import DriverCards
 from tg_bot.misc.models import DriverForm
 from tg_bot.misc.states import DriverFormStates
+from tg_bot.misc.steps import Steps
 from tg_bot.misc.utils import Utils as Ut
 
 logger = logging.getLogger(__name__)
@@ -27,7 +29,7 @@ async def show_my_form(callback: types.CallbackQuery, state: FSMContext):
     driver = await DbDriver(tg_user_id=uid).select()
 
     text_question = await Ut.get_message_text(key="driver_menu_my_form", lang=driver.lang)
-    text_form = await DriverForm().form_completion(db_model=driver, lang=driver.lang)
+    text_form = await DriverCards.form_text(driver=driver, lang=driver.lang)
     markup = await Ut.get_markup(mtype="inline", lang=driver.lang, key="driver_menu_my_form")
     await Ut.send_step_message(user_id=uid, texts=[text_form, text_question], markups=[None, markup])
 
@@ -115,7 +117,8 @@ async def field_selected(callback: types.CallbackQuery, state: FSMContext):
     if cd == "back":
         return await show_my_form(callback=callback, state=state)
 
-    await state.update_data(status=1, function_for_back=form_reset_confirmation, call_function=field_has_changed)
+    await state.update_data(status=1, function_for_back=Steps.id(form_reset_confirmation),
+                            call_function=Steps.id(field_has_changed))
 
     reg_method = getattr(RegistrationSteps, cd)
     await reg_method(state=state, lang=driver.lang)
@@ -152,3 +155,5 @@ async def field_has_changed(state: FSMContext, returned_data: Union[str, int], f
         text = await Ut.get_message_text(key="driver_menu_my_form_error_param_change", lang=driver.lang)
         msg = await Config.BOT.send_message(chat_id=tg_user_id, text=text)
         await Ut.add_msg_to_delete(user_id=tg_user_id, msg_id=msg.message_id)
+
+Steps.register_many({"mf.form_reset_confirmation": form_reset_confirmation, "mf.field_has_changed": field_has_changed})
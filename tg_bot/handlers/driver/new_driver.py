@@ -8,6 +8,7 @@ from tg_bot.db_models.quick_commands import DbDriver
 from tg_bot.handlers.driver.register_driver import RegistrationSteps
 from tg_bot.misc.models import DriverForm
 from tg_bot.misc.states import AfterStart, DriverRegistration
+from tg_bot.misc.steps import Steps
 from tg_bot.misc.utils import Utils as Ut, call_functions, AdditionalButtons
 
 logger = logging.getLogger(__name__)
@@ -42,7 +43,9 @@ async def choose_birth_year(callback: types.CallbackQuery, state: FSMContext):
 
     dmodel = DriverForm()
     await state.update_data(
-        dmodel=dmodel, status=0, call_function=choose_messangers_availabilities, motd_func=motd_message)
+        dmodel=dmodel, status=0, call_function=Steps.id(choose_messangers_availabilities),
+        motd_func=Steps.id(motd_message)
+    )
 
     await RegistrationSteps().birth_year(state=state, lang=ulang, data_model=dmodel)
 
@@ -53,7 +56,7 @@ async def choose_messangers_availabilities(state: FSMContext, returned_data: Uni
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.birth_year = returned_data
-    await state.update_data(dmodel=dmodel, selected_messangers=[], call_function=choose_car_types)
+    await state.update_data(dmodel=dmodel, selected_messangers=[], call_function=Steps.id(choose_car_types))
 
     await RegistrationSteps().messangers(state=state, data_model=dmodel, lang=ulang)
 
@@ -64,7 +67,7 @@ async def choose_car_types(state: FSMContext, returned_data: Union[str, int]):
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.messangers = returned_data
-    await state.update_data(dmodel=dmodel, selected_car_types=[], call_function=choose_citizenships)
+    await state.update_data(dmodel=dmodel, selected_car_types=[], call_function=Steps.id(choose_citizenships))
 
     await RegistrationSteps().car_types(state=state, data_model=dmodel, lang=ulang)
 
@@ -75,7 +78,7 @@ async def choose_citizenships(state: FSMContext, returned_data: Union[str, int])
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.car_types = returned_data
-    await state.update_data(dmodel=dmodel, selected_countries=[], call_function=choose_basis_of_stay)
+    await state.update_data(dmodel=dmodel, selected_countries=[], call_function=Steps.id(choose_basis_of_stay))
 
     await RegistrationSteps().citizenships(state=state, data_model=dmodel, lang=ulang)
 
@@ -86,7 +89,7 @@ async def choose_basis_of_stay(state: FSMContext, returned_data: Union[str, int]
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.citizenships = returned_data
-    await state.update_data(dmodel=dmodel, call_function=choose_95_code)
+    await state.update_data(dmodel=dmodel, call_function=Steps.id(choose_95_code))
 
     await RegistrationSteps().basis_of_stay(state=state, data_model=dmodel, lang=ulang)
 
@@ -97,7 +100,7 @@ async def choose_95_code(state: FSMContext, returned_data: Union[str, int]):
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.basis_of_stay = returned_data
-    await state.update_data(dmodel=dmodel, call_function=choose_date_ready_to_start_work)
+    await state.update_data(dmodel=dmodel, call_function=Steps.id(choose_date_ready_to_start_work))
 
     await RegistrationSteps().availability_95_code(state=state, data_model=dmodel, lang=ulang)
 
@@ -108,7 +111,7 @@ async def choose_date_ready_to_start_work(state: FSMContext, returned_data: Unio
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.availability_95_code = returned_data
-    await state.update_data(dmodel=dmodel, call_function=indicate_language_skills)
+    await state.update_data(dmodel=dmodel, call_function=Steps.id(indicate_language_skills))
 
     await RegistrationSteps().date_start_work(state=state, data_model=dmodel, lang=ulang)
 
@@ -119,7 +122,7 @@ async def indicate_language_skills(state: FSMContext, returned_data: Union[str,
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.date_start_work = returned_data
-    await state.update_data(dmodel=dmodel, languages_skills=[], call_function=indicate_job_experience)
+    await state.update_data(dmodel=dmodel, languages_skills=[], call_function=Steps.id(indicate_job_experience))
 
     await RegistrationSteps().language_skills(state=state, data_model=dmodel, lang=ulang)
 
@@ -130,7 +133,7 @@ async def indicate_job_experience(state: FSMContext, returned_data: Union[str, i
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.language_skills = returned_data
-    await state.update_data(dmodel=dmodel, job_experience=[], call_function=choose_need_internship)
+    await state.update_data(dmodel=dmodel, job_experience=[], call_function=Steps.id(choose_need_internship))
 
     await RegistrationSteps().job_experience(state=state, data_model=dmodel, lang=ulang)
 
@@ -141,7 +144,7 @@ async def choose_need_internship(state: FSMContext, returned_data: Union[str, in
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.job_experience = returned_data
-    await state.update_data(dmodel=dmodel, call_function=choose_unsuitable_countries)
+    await state.update_data(dmodel=dmodel, call_function=Steps.id(choose_unsuitable_countries))
 
     await RegistrationSteps().need_internship(state=state, data_model=dmodel, lang=ulang)
 
@@ -152,7 +155,7 @@ async def choose_unsuitable_countries(state: FSMContext, returned_data: Union[st
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.need_internship = returned_data
-    await state.update_data(dmodel=dmodel, unsuitable_countries=[], call_function=choose_dangerous_goods)
+    await state.update_data(dmodel=dmodel, unsuitable_countries=[], call_function=Steps.id(choose_dangerous_goods))
 
     await RegistrationSteps().unsuitable_countries(state=state, data_model=dmodel, lang=ulang)
 
@@ -163,7 +166,7 @@ async def choose_dangerous_goods(state: FSMContext, returned_data: Union[str, in
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.unsuitable_countries = returned_data
-    await state.update_data(dmodel=dmodel, dangerous_goods=[], call_function=write_expected_salary)
+    await state.update_data(dmodel=dmodel, dangerous_goods=[], call_function=Steps.id(write_expected_salary))
 
     await RegistrationSteps().dangerous_goods(state=state, data_model=dmodel, lang=ulang)
 
@@ -174,7 +177,7 @@ async def write_expected_salary(state: FSMContext, returned_data: Union[str, int
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.dangerous_goods = returned_data
-    await state.update_data(dmodel=dmodel, call_function=choose_categories)
+    await state.update_data(dmodel=dmodel, call_function=Steps.id(choose_categories))
 
     await RegistrationSteps().expected_salary(state=state, data_model=dmodel, lang=ulang)
 
@@ -185,7 +188,7 @@ async def choose_categories(state: FSMContext, returned_data: Union[str, int]):
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.expected_salary = returned_data
-    await state.update_data(dmodel=dmodel, categories=[], call_function=choose_country_driving_licence)
+    await state.update_data(dmodel=dmodel, categories=[], call_function=Steps.id(choose_country_driving_licence))
 
     await RegistrationSteps().categories_availability(state=state, data_model=dmodel, lang=ulang)
 
@@ -196,7 +199,7 @@ async def choose_country_driving_licence(state: FSMContext, returned_data: Union
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.categories_availability = returned_data
-    await state.update_data(dmodel=dmodel, call_function=choose_country_current_live)
+    await state.update_data(dmodel=dmodel, call_function=Steps.id(choose_country_current_live))
 
     await RegistrationSteps().country_driving_licence(state=state, data_model=dmodel, lang=ulang)
 
@@ -207,7 +210,7 @@ async def choose_country_current_live(state: FSMContext, returned_data: Union[st
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.country_driving_licence = returned_data
-    await state.update_data(dmodel=dmodel, call_function=choose_work_type)
+    await state.update_data(dmodel=dmodel, call_function=Steps.id(choose_work_type))
 
     await RegistrationSteps().country_current_live(state=state, data_model=dmodel, lang=ulang)
 
@@ -218,7 +221,7 @@ async def choose_work_type(state: FSMContext, returned_data: Union[str, int]):
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.country_current_live = returned_data
-    await state.update_data(dmodel=dmodel, call_function=choose_cadence)
+    await state.update_data(dmodel=dmodel, call_function=Steps.id(choose_cadence))
 
     await RegistrationSteps().work_type(state=state, data_model=dmodel, lang=ulang)
 
@@ -229,7 +232,7 @@ async def choose_cadence(state: FSMContext, returned_data: Union[str, int]):
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.work_type = returned_data
-    await state.update_data(dmodel=dmodel, selected_cadence=[], call_function=choose_crew)
+    await state.update_data(dmodel=dmodel, selected_cadence=[], call_function=Steps.id(choose_crew))
 
     await RegistrationSteps().cadence(state=state, data_model=dmodel, lang=ulang)
 
@@ -240,7 +243,7 @@ async def choose_crew(state: FSMContext, returned_data: Union[str, int]):
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.cadence = returned_data
-    await state.update_data(dmodel=dmodel, call_function=choose_driver_gender)
+    await state.update_data(dmodel=dmodel, call_function=Steps.id(choose_driver_gender))
 
     await RegistrationSteps().crew(state=state, data_model=dmodel, lang=ulang)
 
@@ -251,7 +254,7 @@ async def choose_driver_gender(state: FSMContext, returned_data: Union[str, int]
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.crew = returned_data
-    await state.update_data(dmodel=dmodel, call_function=write_phone_number)
+    await state.update_data(dmodel=dmodel, call_function=Steps.id(write_phone_number))
 
     await RegistrationSteps().driver_gender(state=state, data_model=dmodel, lang=ulang)
 
@@ -262,7 +265,7 @@ async def write_phone_number(state: FSMContext, returned_data: Union[str, int]):
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.driver_gender = returned_data
-    await state.update_data(dmodel=dmodel, call_function=write_name)
+    await state.update_data(dmodel=dmodel, call_function=Steps.id(write_name))
 
     await RegistrationSteps().phone_number(state=state, data_model=dmodel, lang=ulang)
 
@@ -273,7 +276,7 @@ async def write_name(state: FSMContext, returned_data: Union[str, int]):
     dmodel: DriverForm = data["dmodel"]
 
     dmodel.phone_number = returned_data
-    await state.update_data(dmodel=dmodel, call_function=form_confirmation)
+    await state.update_data(dmodel=dmodel, call_function=Steps.id(form_confirmation))
 
     await RegistrationSteps().name(state=state, lang=ulang, data_model=dmodel)
 
@@ -307,14 +310,14 @@ async def registration_finish(callback: types.CallbackQuery, state: FSMContext):
     cd = callback.data
     if cd == "back":
         dmodel.name = None
-        await state.update_data(dmodel=dmodel, call_function=form_confirmation)
+        await state.update_data(dmodel=dmodel, call_function=Steps.id(form_confirmation))
         return await RegistrationSteps().name(state=state, data_model=dmodel, lang=ulang)
 
     elif cd == "confirm":
         form_price = await dmodel.calculate_form_data()
         result = await DbDriver(
             tg_user_id=uid, opens_count=0, form_price=form_price, lang=ulang, status=1,
-            **(dmodel.model_dump())
+            username=callback.from_user.username, **(dmodel.model_dump())
         ).add()
         if result:
             text = await Ut.get_message_text(key="driver_reg_finish", lang=ulang)
@@ -340,3 +343,5 @@ call_functions.update({
     "driver_gender": choose_driver_gender,
     "name": write_name
 })
+Steps.register_many({f"nd.{step_id}": func for step_id, func in call_functions.items()})
+Steps.register_many({"nd.motd": motd_message, "nd.form_confirmation": form_confirmation})
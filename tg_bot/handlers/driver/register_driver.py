@@ -15,6 +15,7 @@ from tg_bot.keyboards.default import request_contact_default
 from tg_bot.keyboards.inline import CustomInlineMarkups as Cim
 from tg_bot.misc.models import DriverForm
 from tg_bot.misc.states import DriverRegistration
+from tg_bot.misc.steps import Steps
 from tg_bot.misc.utils import Utils as Ut, call_functions, AdditionalButtons, localization
 
 logger = logging.getLogger(__name__)
@@ -71,9 +72,10 @@ class RegistrationSteps:
             if model_attr and dmodel:
                 setattr(dmodel, model_attr, None)
 
-            await state.update_data(dmodel=dmodel, function_for_back=function_for_back, call_function=next_function)
+            await state.update_data(
+                dmodel=dmodel, function_for_back=Steps.id(function_for_back), call_function=Steps.id(next_function))
 
-            if function_for_back == data["motd_func"]:
+            if Steps.id(function_for_back) == data["motd_func"]:
                 params = {"callback": callback, "state": state}
 
             else:
@@ -86,7 +88,7 @@ class RegistrationSteps:
             params = {"message": state.key.user_id, "state": state}
 
         data = await state.get_data()
-        await data["function_for_back"](**params)
+        await Steps.get(data["function_for_back"])(**params)
         return True
 
     @staticmethod
@@ -97,7 +99,7 @@ class RegistrationSteps:
         if data["status"] in [1, 2]:
             func_params.append(additional_field)
 
-        await data["call_function"](*func_params)
+        await Steps.get(data["call_function"])(*func_params)
         return True
 
     @staticmethod
@@ -506,7 +508,7 @@ class RegistrationSteps:
         markup = await Cim.year(from_year=datetime.now(tz=Config.TIMEZONE).year - 42, lang=lang)
         await Ut.send_step_message(user_id=state.key.user_id, texts=[text_form, text_question], markups=[None, markup])
 
-        await state.update_data(min_year=None, status=status, function_for_back=function_for_back)
+        await state.update_data(min_year=None, status=status, function_for_back=Steps.id(function_for_back))
         await state.set_state(DriverRegistration.ChooseBirthYear)
 
     @classmethod
@@ -561,7 +563,8 @@ class RegistrationSteps:
         status = data["status"]
         if (status == 2) and (not min_year):
             await state.update_data(min_year=returned_value, function_for_back_secondary=data["function_for_back"],
-                                    status_secondary=data["status"], function_for_back=cls.birth_year, status=0)
+                                    status_secondary=data["status"], function_for_back=Steps.id(cls.birth_year),
+                                    status=0)
 
             text = await Ut.get_message_text(key="company_filters_birth_year_2", lang=lang)
             markup = await Cim.year(from_year=datetime.now(tz=Config.TIMEZONE).year - 42, lang=lang)
@@ -851,7 +854,8 @@ class RegistrationSteps:
         text_form = await cls.model_form_correct(lang=lang, data_model=data_model)
         await Ut.send_step_message(user_id=state.key.user_id, texts=[text_form, text_question], markups=[None, markup])
 
-        await state.update_data(date_start_work_left=None, status=status, function_for_back=function_for_back)
+        await state.update_data(
+            date_start_work_left=None, status=status, function_for_back=Steps.id(function_for_back))
         await state.set_state(DriverRegistration.ChooseDateReadyToStartWork)
 
     @classmethod
@@ -895,7 +899,7 @@ class RegistrationSteps:
             status = data["status"]
             if (status == 2) and (not date_start_work_left):
                 await state.update_data(
-                    date_start_work_left=returned_value, function_for_back=cls.date_start_work,
+                    date_start_work_left=returned_value, function_for_back=Steps.id(cls.date_start_work),
                     function_for_back_secondary=data["function_for_back"], status=0,
                     status_secondary=data["status"]
                 )
@@ -1469,7 +1473,7 @@ class RegistrationSteps:
 
         text_question = await Ut.get_message_text(key=text_key, lang=lang)
         markup = await Ut.get_markup(
-            mtype="inline", key="work_types", lang=lang, without_buttons=["skip" if status == 2 else []],
+            mtype="inline", key="work_types", lang=lang, without_buttons=["skip"] if status == 2 else [],
             additional_buttons=additional_buttons)
         await state.update_data(title=text_question, markup=markup)
 
@@ -1787,3 +1791,5 @@ router.callback_query.register(RegistrationSteps.crew_handler, DriverRegistratio
 router.callback_query.register(RegistrationSteps.driver_gender_handler, DriverRegistration.ChooseGender)
 router.message.register(RegistrationSteps.name_handler, DriverRegistration.WriteName)
 router.callback_query.register(RegistrationSteps.name_handler, DriverRegistration.WriteName)
+
+Steps.register_classmethods(prefix="reg", owner=RegistrationSteps)
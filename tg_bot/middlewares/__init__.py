@@ -0,0 +1,2 @@
+from .identity_map import IdentityMapMiddleware
+from .usernames import UsernamesMiddleware
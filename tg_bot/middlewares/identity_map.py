@@ -0,0 +1,20 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from tg_bot.db_models.identity_map import IdentityMap
+
+
+class IdentityMapMiddleware(BaseMiddleware):
+    async def __call__(
+            self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]], event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        identity_map, token = IdentityMap.open()
+        data["identity_map"] = identity_map
+        try:
+            return await handler(event, data)
+
+        finally:
+            IdentityMap.close(token)
@@ -0,0 +1,18 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+
+from tg_bot.misc.usernames import UsernamesCache
+
+
+class UsernamesMiddleware(BaseMiddleware):
+    async def __call__(
+            self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]], event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        user: User = data.get("event_from_user")
+        if user:
+            await UsernamesCache.remember(tg_user_id=user.id, username=user.username)
+
+        return await handler(event, data)
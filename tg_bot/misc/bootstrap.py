@@ -0,0 +1,59 @@
+import asyncio
+import logging
+
+import stripe
+
+from config import Config
+from tg_bot.db_models.counters import FormsCounter
+from tg_bot.db_models.db_gino import connect_to_db
+from tg_bot.db_models.indexes import create_indexes
+from tg_bot.db_models.migrations import apply_migrations
+from tg_bot.handlers import routers
+from tg_bot.middlewares import IdentityMapMiddleware, UsernamesMiddleware
+from tg_bot.misc.cleanup import MessagesCleanup
+from tg_bot.misc.fsm_storage import FsmStorages
+from tg_bot.misc.utils import Utils as Ut
+
+logger = logging.getLogger(__name__)
+
+
+class Bootstrap:
+    background_tasks = set()
+
+    @staticmethod
+    def setup_logging():
+        logging.basicConfig(level=logging.INFO,
+                            format=u'%(filename)s:%(lineno)d #%(levelname)-8s [%(asctime)s] - %(name)s - %(message)s')
+        logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+
+    @staticmethod
+    async def prepare_database():
+        await connect_to_db(remove_data=Config.DATABASE_CLEANUP)
+        await apply_migrations()
+        await create_indexes()
+
+    @classmethod
+    async def prepare_dispatcher(cls, connect: bool = False, pool_name: str = "bot"):
+        stripe.api_key = Config.STRIPE_SECRET_KEY
+
+        if connect:
+            await connect_to_db(remove_data=False, name=pool_name)
+
+        await Ut.load_localizations_files()
+
+        FormsCounter.configure(name=Config.FORMS_COUNTER_STORAGE)
+        await FormsCounter.reconcile()
+        reconcile_task = asyncio.create_task(FormsCounter.reconcile_loop(Config.FORMS_COUNTER_RECONCILE_INTERVAL))
+        cls.background_tasks.add(reconcile_task)
+
+        MessagesCleanup.configure(
+            name=Config.MESSAGES_CLEANUP_STORAGE, max_per_user=Config.MESSAGES_CLEANUP_MAX_PER_USER)
+        cleanup_task = asyncio.create_task(MessagesCleanup.evict_loop(interval=60 * 60))
+        cls.background_tasks.add(cleanup_task)
+
+        Config.DISPATCHER.fsm.storage = FsmStorages.build(name=Config.FSM_STORAGE, redis_url=Config.FSM_REDIS_URL)
+        Config.DISPATCHER.update.outer_middleware(IdentityMapMiddleware())
+        Config.DISPATCHER.update.outer_middleware(UsernamesMiddleware())
+
+        if routers:
+            Config.DISPATCHER.include_routers(*routers)
@@ -0,0 +1,80 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple, Union
+
+from aiogram.types import InlineKeyboardMarkup
+
+from config import Config
+from tg_bot.db_models.quick_commands import DbDriver
+from tg_bot.db_models.schemas import Driver
+from tg_bot.keyboards.inline import CustomInlineMarkups as Cim
+from tg_bot.misc.models import DriverForm
+from tg_bot.misc.utils import Utils as Ut
+
+CardKey = Tuple[int, Optional[datetime], str, str]
+
+
+class DriverCards:
+    COMPANY = "company"
+    OWNER = "owner"
+    COMPANY_CARD = "company_card"
+
+    _cards: "OrderedDict[CardKey, Tuple[str, Optional[InlineKeyboardMarkup]]]" = OrderedDict()
+    _driver_keys: Dict[int, Set[CardKey]] = {}
+
+    @classmethod
+    async def _get(cls, key: CardKey) -> Union[Tuple[str, Optional[InlineKeyboardMarkup]], None]:
+        card = cls._cards.get(key)
+        if card is not None:
+            cls._cards.move_to_end(key)
+
+        return card
+
+    @classmethod
+    async def _put(cls, key: CardKey, card: Tuple[str, Optional[InlineKeyboardMarkup]]):
+        cls._cards[key] = card
+        cls._cards.move_to_end(key)
+        cls._driver_keys.setdefault(key[0], set()).add(key)
+
+        while len(cls._cards) > Config.DRIVER_CARDS_CACHE_SIZE:
+            old_key, _ = cls._cards.popitem(last=False)
+            driver_keys = cls._driver_keys.get(old_key[0])
+            if driver_keys is not None:
+                driver_keys.discard(old_key)
+                if not driver_keys:
+                    del cls._driver_keys[old_key[0]]
+
+    @classmethod
+    async def invalidate(cls, driver_id: int):
+        for key in cls._driver_keys.pop(driver_id, set()):
+            cls._cards.pop(key, None)
+
+    @classmethod
+    async def form_text(cls, driver: Driver, lang: str, for_company: bool = False) -> str:
+        key = (driver.id, driver.updated_at, lang, cls.COMPANY if for_company else cls.OWNER)
+        card = await cls._get(key)
+        if card is None:
+            text = await DriverForm().form_completion(lang=lang, db_model=driver, for_company=for_company)
+            card = (text, None)
+            await cls._put(key, card)
+
+        return card[0]
+
+    @classmethod
+    async def company_card(cls, driver: Driver, lang: str) -> Tuple[str, InlineKeyboardMarkup]:
+        key = (driver.id, driver.updated_at, lang, cls.COMPANY_CARD)
+        card = await cls._get(key)
+        if card is None:
+            text = await Ut.get_message_text(lang=lang, key="company_driver_found")
+            text = text.replace("%driver_id%", str(driver.id))
+            text = text.replace("%driver_price%", str(driver.form_price))
+            text += "\n\n" + await cls.form_text(driver=driver, lang=lang, for_company=True)
+            markup = await Cim.find_driver_menu(lang=lang, driver_id=driver.id)
+            card = (text, markup)
+            await cls._put(key, card)
+
+        text, markup = card
+        return text, markup.model_copy(deep=True)
+
+
+DbDriver.update_listeners.append(DriverCards.invalidate)
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+import traceback
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from sqlalchemy import and_, text
+
+from tg_bot.db_models.db_gino import db
+from tg_bot.db_models.schemas import CleanupMessage
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCleanupBackend:
+    def __init__(self, max_per_user: int, ttl: int):
+        self.max_per_user = max_per_user
+        self.ttl = ttl
+
+        # (user_id, secondary) -> (message ids, unix send times)
+        self.messages: Dict[Tuple[int, bool], Tuple[array, array]] = {}
+
+    async def add(self, user_id: int, msg_id: int, secondary: bool):
+        msg_ids, sent_at = self.messages.setdefault((user_id, secondary), (array("q"), array("I")))
+        msg_ids.append(msg_id)
+        sent_at.append(int(time.time()))
+
+        if len(msg_ids) > self.max_per_user:
+            del msg_ids[0]
+            del sent_at[0]
+
+    async def take(self, user_id: int, secondary: bool) -> List[int]:
+        entry = self.messages.pop((user_id, secondary), None)
+        if entry is None:
+            return []
+
+        border = time.time() - self.ttl
+        return [msg_id for msg_id, sent_at in zip(*entry) if sent_at > border]
+
+    async def take_all(self) -> Dict[int, List[int]]:
+        result = {}
+        for user_id, secondary in list(self.messages):
+            if not secondary:
+                result[user_id] = await self.take(user_id=user_id, secondary=False)
+
+        return result
+
+    async def evict(self) -> int:
+        border = time.time() - self.ttl
+        evicted = 0
+        for key, (msg_ids, sent_at) in list(self.messages.items()):
+            fresh_from = 0
+            while (fresh_from < len(sent_at)) and (sent_at[fresh_from] <= border):
+                fresh_from += 1
+
+            if fresh_from == len(msg_ids):
+                del self.messages[key]
+
+            elif fresh_from:
+                del msg_ids[:fresh_from]
+                del sent_at[:fresh_from]
+
+            evicted += fresh_from
+
+        return evicted
+
+
+class PostgresCleanupBackend:
+    def __init__(self, max_per_user: int, ttl: int):
+        self.max_per_user = max_per_user
+        self.ttl = ttl
+
+    async def add(self, user_id: int, msg_id: int, secondary: bool):
+        # The CTE insert is not visible to the subquery, so one less old row is kept
+        await db.status(text(
+            "WITH inserted AS ("
+            "INSERT INTO cleanup_messages (user_id, message_id, secondary) VALUES (:user_id, :msg_id, :secondary) "
+            "ON CONFLICT DO NOTHING) "
+            "DELETE FROM cleanup_messages WHERE user_id = :user_id AND secondary = :secondary AND message_id IN ("
+            "SELECT message_id FROM cleanup_messages WHERE user_id = :user_id AND secondary = :secondary "
+            "ORDER BY message_id DESC OFFSET :keep)"
+        ).bindparams(user_id=user_id, msg_id=msg_id, secondary=int(secondary), keep=self.max_per_user - 1))
+
+    async def take(self, user_id: int, secondary: bool) -> List[int]:
+        rows = await CleanupMessage.delete.where(and_(
+            CleanupMessage.user_id == user_id, CleanupMessage.secondary == int(secondary)
+        )).returning(CleanupMessage.message_id, CleanupMessage.created_at).gino.all()
+
+        border = datetime.now(tz=timezone.utc) - timedelta(seconds=self.ttl)
+        return sorted(row[0] for row in rows if row[1] > border)
+
+    async def take_all(self) -> Dict[int, List[int]]:
+        rows = await CleanupMessage.delete.where(CleanupMessage.secondary == 0).returning(
+            CleanupMessage.user_id, CleanupMessage.message_id, CleanupMessage.created_at).gino.all()
+
+        border = datetime.now(tz=timezone.utc) - timedelta(seconds=self.ttl)
+        result = {}
+        for user_id, msg_id, created_at in rows:
+            if created_at > border:
+                result.setdefault(user_id, []).append(msg_id)
+
+        return result
+
+    async def evict(self) -> int:
+        border = datetime.now(tz=timezone.utc) - timedelta(seconds=self.ttl)
+        status = await CleanupMessage.delete.where(CleanupMessage.created_at <= border).gino.status()
+        return int(status[0].split()[-1]) if status and status[0] else 0
+
+
+class MessagesCleanup:
+    MEMORY = "memory"
+    POSTGRES = "postgres"
+
+    # Bots can not delete messages older than 48 hours, keep a margin for the deletion itself
+    TTL = 47 * 60 * 60
+    MAX_PER_USER = 50
+
+    backend = MemoryCleanupBackend(max_per_user=MAX_PER_USER, ttl=TTL)
+
+    @classmethod
+    def configure(cls, name: str, max_per_user: int):
+        if name == cls.POSTGRES:
+            cls.backend = PostgresCleanupBackend(max_per_user=max_per_user, ttl=cls.TTL)
+
+        else:
+            cls.backend = MemoryCleanupBackend(max_per_user=max_per_user, ttl=cls.TTL)
+
+    @classmethod
+    async def add(cls, user_id: int, msg_id: int, secondary: bool = False):
+        await cls.backend.add(user_id=int(user_id), msg_id=int(msg_id), secondary=secondary)
+
+    @classmethod
+    async def take(cls, user_id: int, secondary: bool = False) -> List[int]:
+        return await cls.backend.take(user_id=int(user_id), secondary=secondary)
+
+    @classmethod
+    async def take_all(cls) -> Dict[int, List[int]]:
+        return await cls.backend.take_all()
+
+    @classmethod
+    async def evict_loop(cls, interval: int):
+        while True:
+            await asyncio.sleep(interval)
+
+            try:
+                evicted = await cls.backend.evict()
+                if evicted:
+                    logger.info(f"Expired messages are evicted from the cleanup registry. count={evicted}")
+
+            except Exception:
+                logger.error(traceback.format_exc())
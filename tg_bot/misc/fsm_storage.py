@@ -0,0 +1,153 @@
+import importlib
+import json
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from pydantic import BaseModel
+from sqlalchemy import text
+
+from tg_bot.db_models.db_gino import db
+
+logger = logging.getLogger(__name__)
+
+
+class FsmCodec:
+    TAG = "__fsm__"
+    ALLOWED_MODULES = ("tg_bot.", "aiogram.types.")
+
+    @classmethod
+    def object_path(cls, obj: Any) -> str:
+        path = f"{obj.__module__}:{obj.__qualname__}"
+        if not path.startswith(cls.ALLOWED_MODULES):
+            raise TypeError(f"{path} can not be stored in FSM data")
+
+        return path
+
+    @classmethod
+    def resolve_path(cls, path: str) -> Any:
+        if not path.startswith(cls.ALLOWED_MODULES):
+            raise TypeError(f"{path} can not be loaded from FSM data")
+
+        module_name, qualname = path.split(":", 1)
+        target = importlib.import_module(module_name)
+        for attr in qualname.split("."):
+            target = getattr(target, attr)
+
+        return target
+
+    @classmethod
+    def encode(cls, obj: Any) -> Dict[str, Any]:
+        if isinstance(obj, datetime):
+            return {cls.TAG: "datetime", "value": obj.isoformat()}
+
+        if isinstance(obj, BaseModel):
+            return {cls.TAG: "model", "path": cls.object_path(obj.__class__),
+                    "value": obj.model_dump(mode="json", exclude_none=True)}
+
+        if callable(obj) and hasattr(obj, "__qualname__"):
+            target = getattr(obj, "__func__", obj)
+            owner = getattr(obj, "__self__", None)
+            if isinstance(owner, type):
+                return {cls.TAG: "callable", "path": f"{cls.object_path(owner)}.{target.__name__}"}
+
+            return {cls.TAG: "callable", "path": cls.object_path(target)}
+
+        raise TypeError(f"Object of type {obj.__class__.__name__} is not FSM serializable")
+
+    @classmethod
+    def decode(cls, obj: Dict[str, Any]) -> Any:
+        tag = obj.get(cls.TAG)
+        if tag is None:
+            return obj
+
+        if tag == "datetime":
+            return datetime.fromisoformat(obj["value"])
+
+        if tag == "model":
+            return cls.resolve_path(obj["path"]).model_validate(obj["value"])
+
+        if tag == "callable":
+            return cls.resolve_path(obj["path"])
+
+        return obj
+
+    @classmethod
+    def dumps(cls, data: Any) -> str:
+        return json.dumps(data, default=cls.encode, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def loads(cls, data: str) -> Any:
+        return json.loads(data, object_hook=cls.decode)
+
+
+class PostgresStorage(BaseStorage):
+    def __init__(self, key_builder: Optional[KeyBuilder] = None, dumps: Callable[[Any], str] = FsmCodec.dumps,
+                 loads: Callable[[str], Any] = FsmCodec.loads):
+        self.key_builder = key_builder if key_builder else DefaultKeyBuilder()
+        self.dumps = dumps
+        self.loads = loads
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        await db.status(text(
+            "INSERT INTO fsm_states (key, state) VALUES (:key, :state) "
+            "ON CONFLICT (key) DO UPDATE SET state = EXCLUDED.state, updated_at = now()"
+        ).bindparams(key=self.key_builder.build(key), state=state))
+
+        if state is None:
+            await self.cleanup(key=key)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await db.scalar(text("SELECT state FROM fsm_states WHERE key = :key").bindparams(
+            key=self.key_builder.build(key)))
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await db.status(text(
+            "INSERT INTO fsm_states (key, data) VALUES (:key, :data) "
+            "ON CONFLICT (key) DO UPDATE SET data = EXCLUDED.data, updated_at = now()"
+        ).bindparams(key=self.key_builder.build(key), data=self.dumps(data)))
+
+        if not data:
+            await self.cleanup(key=key)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        data = await db.scalar(text("SELECT data FROM fsm_states WHERE key = :key").bindparams(
+            key=self.key_builder.build(key)))
+        return self.loads(data) if data else {}
+
+    async def cleanup(self, key: StorageKey):
+        await db.status(text(
+            "DELETE FROM fsm_states WHERE key = :key AND state IS NULL AND (data IS NULL OR data = '{}')"
+        ).bindparams(key=self.key_builder.build(key)))
+
+    async def close(self) -> None:
+        pass
+
+
+class FsmStorages:
+    MEMORY = "memory"
+    POSTGRES = "postgres"
+    REDIS = "redis"
+
+    @classmethod
+    def build(cls, name: str, redis_url: Optional[str] = None) -> BaseStorage:
+        if name == cls.POSTGRES:
+            return PostgresStorage()
+
+        if name == cls.REDIS:
+            try:
+                from aiogram.fsm.storage.redis import RedisStorage
+
+            except ImportError:
+                raise RuntimeError("FSM_STORAGE=redis requires the redis package to be installed")
+
+            return RedisStorage.from_url(redis_url, json_dumps=FsmCodec.dumps, json_loads=FsmCodec.loads)
+
+        if name != cls.MEMORY:
+            logger.warning(f"Unknown FSM storage, the memory one is used. name={name}")
+
+        return MemoryStorage()
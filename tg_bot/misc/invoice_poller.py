@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import time
+import traceback
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from tg_bot.db_models.schemas import Payment
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[int] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity else max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class InvoicePoller:
+    def __init__(self, check: Callable[[Payment], Awaitable[Optional[float]]],
+                 load_pending: Callable[[], Awaitable[List[Payment]]], min_interval: float, max_interval: float,
+                 concurrency: int, rate: float):
+        self.check = check
+        self.load_pending = load_pending
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate=rate)
+
+        # payment id -> (next check unix time, number of checks, invoice due date)
+        self.schedule: Dict[int, Tuple[float, int, Optional[float]]] = {}
+
+    def next_check_at(self, checks: int, due_date: Optional[float]) -> float:
+        now = time.time()
+        next_at = now + min(self.max_interval, self.min_interval * 2 ** checks)
+        if due_date and (due_date > now):
+            next_at = min(next_at, due_date + 1)
+
+        return next_at
+
+    async def check_payment(self, payment: Payment):
+        _, checks, due_date = self.schedule.get(payment.id, (0, 0, None))
+        try:
+            async with self.semaphore:
+                await self.bucket.acquire()
+                due_date = await self.check(payment)
+
+        except Exception:
+            logger.error(f"Invoice check failed. payment_id={payment.id}\n{traceback.format_exc()}")
+
+        self.schedule[payment.id] = (self.next_check_at(checks=checks, due_date=due_date), checks + 1, due_date)
+
+    async def poll(self) -> int:
+        payments = await self.load_pending()
+        pending_ids = {payment.id for payment in payments}
+        for payment_id in list(self.schedule):
+            if payment_id not in pending_ids:
+                del self.schedule[payment_id]
+
+        now = time.time()
+        due_payments = [payment for payment in payments if self.schedule.get(payment.id, (0,))[0] <= now]
+        await asyncio.gather(*[self.check_payment(payment=payment) for payment in due_payments])
+        return len(due_payments)
+
+    async def run(self):
+        logger.info(f"Invoice polling has started. min_interval={self.min_interval}; "
+                    f"max_interval={self.max_interval}; rate={self.bucket.rate}")
+        while True:
+            try:
+                await self.poll()
+
+            except Exception:
+                logger.error(traceback.format_exc())
+
+            await asyncio.sleep(self.min_interval)
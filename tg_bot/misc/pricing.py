@@ -0,0 +1,125 @@
+from typing import Dict, List, Optional, Tuple, Union, FrozenSet, Iterable
+
+from tg_bot.db_models.schemas import Driver
+
+
+class PricingPlan:
+    active: Optional["PricingPlan"] = None
+
+    def __init__(self, base_price: float, corrections: Dict[str, Dict[str, float]], lang_data: Dict):
+        self.base_price = base_price
+
+        self.car_types = corrections.get("car_types", {})
+        self.basis_of_stay = corrections.get("basis_of_stay", {})
+        self.availability_95_code = corrections.get("availability_95_code", {})
+        self.need_internship = corrections.get("need_internship", {})
+        self.dangerous_goods = corrections.get("dangerous_goods", {})
+        self.work_types = corrections.get("work_types", {})
+        self.cadence = corrections.get("cadence", {})
+        self.unselected_countries = corrections.get("unsuitable_countries", {}).get("%unselected%", 0)
+
+        self.language_skills, self.language_skills_by_col = self.compile_selector(
+            corrections.get("language_skills", {}))
+        self.job_experience, self.job_experience_by_col = self.compile_selector(corrections.get("job_experience", {}))
+
+        self.expected_salary: List[Tuple[float, float, float]] = []
+        for corr_el, corr_value in corrections.get("expected_salary", {}).items():
+            min_value, max_value = list(map(float, corr_el.split("-")))
+            self.expected_salary.append((min_value, max_value, corr_value))
+
+        self.continents: Dict[str, float] = {}
+        for corr_el, corr_value in corrections.get("country_current_living", {}).items():
+            if "cont:" in corr_el:
+                self.continents[corr_el.replace("cont:", "")] = corr_value
+
+        self.country_continents = self.compile_country_continents(lang_data=lang_data)
+
+    @staticmethod
+    def compile_selector(selector_corrections: Dict[str, float]) -> Tuple[Dict[str, float], Dict[str, float]]:
+        exact, by_col = {}, {}
+        for corr_el, corr_value in selector_corrections.items():
+            if "%least_one%" in corr_el:
+                col = corr_el.split(":")[1]
+                by_col[col] = by_col.get(col, 0) + corr_value
+
+            else:
+                exact[corr_el] = corr_value
+
+        return exact, by_col
+
+    @staticmethod
+    def compile_country_continents(lang_data: Dict) -> Dict[str, FrozenSet[str]]:
+        country_continents: Dict[str, set] = {}
+        for markup_key, rows in lang_data["markups"]["inline"].items():
+            if not markup_key.startswith("countries_"):
+                continue
+
+            continent = markup_key.replace("countries_", "", 1).rsplit("_", 1)[0]
+            for buttons_data in rows:
+                for btn_cd in buttons_data.values():
+                    country_continents.setdefault(btn_cd, set()).add(continent)
+
+        return {code: frozenset(continents) for code, continents in country_continents.items()}
+
+    @classmethod
+    def load(cls, base_price: float, corrections: Dict[str, Dict[str, float]], lang_data: Dict) -> "PricingPlan":
+        cls.active = cls(base_price=base_price, corrections=corrections, lang_data=lang_data)
+        return cls.active
+
+    @staticmethod
+    def price_selector(values: List[str], exact: Dict[str, float], by_col: Dict[str, float]) -> float:
+        price = 0
+        for sel_val in values:
+            price += exact.get(sel_val, 0)
+            if by_col:
+                price += by_col.get(sel_val.split(":")[1], 0)
+
+        return price
+
+    def price(self, model: Union[Driver, "DriverForm"]) -> float:
+        form_price = self.base_price
+
+        if not (model.car_types is None):
+            form_price += sum(self.car_types.get(sel_val, 0) for sel_val in model.car_types)
+
+        if not (model.basis_of_stay is None):
+            form_price += self.basis_of_stay.get(model.basis_of_stay, 0)
+
+        if not (model.availability_95_code is None):
+            form_price += self.availability_95_code.get(model.availability_95_code, 0)
+
+        if not (model.language_skills is None):
+            form_price += self.price_selector(
+                values=model.language_skills, exact=self.language_skills, by_col=self.language_skills_by_col)
+
+        if not (model.job_experience is None):
+            form_price += self.price_selector(
+                values=model.job_experience, exact=self.job_experience, by_col=self.job_experience_by_col)
+
+        if not (model.need_internship is None):
+            form_price += self.need_internship.get(model.need_internship, 0)
+
+        if (not (model.unsuitable_countries is None)) and (not model.unsuitable_countries):
+            form_price += self.unselected_countries
+
+        if not (model.dangerous_goods is None):
+            form_price += sum(self.dangerous_goods.get(sel_val, 0) for sel_val in model.dangerous_goods)
+
+        if not (model.expected_salary is None):
+            for min_value, max_value, corr_value in self.expected_salary:
+                form_price += corr_value if min_value <= model.expected_salary <= max_value else 0
+
+        if not (model.country_current_live is None):
+            for continent in self.country_continents.get(model.country_current_live, ()):
+                form_price += self.continents.get(continent, 0)
+
+        if not (model.work_type is None):
+            form_price += self.work_types.get(model.work_type, 0)
+
+        if not (model.cadence is None):
+            form_price += sum(self.cadence.get(sel_val, 0) for sel_val in model.cadence)
+
+        return form_price
+
+    def price_many(self, models: Iterable[Union[Driver, "DriverForm"]]) -> List[float]:
+        return [self.price(model) for model in models]
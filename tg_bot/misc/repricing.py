@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import traceback
+from typing import List, Optional, Tuple
+
+import stripe
+
+from config import Config
+from tg_bot.db_models.quick_commands import DbDriver, DbRepricingCheckpoint
+from tg_bot.db_models.schemas import Driver
+from tg_bot.misc.models import DriverForm
+from tg_bot.misc.utils import corrections
+
+logger = logging.getLogger(__name__)
+
+
+class Repricing:
+    def __init__(self, chunk_size: int = 500, stripe_concurrency: int = 8, dry_run: bool = False):
+        self.chunk_size = chunk_size
+        self.stripe_semaphore = asyncio.Semaphore(stripe_concurrency)
+        self.dry_run = dry_run
+        self.signature = self.plan_signature()
+
+    @staticmethod
+    def plan_signature() -> str:
+        plan = json.dumps({"base_price": Config.BASE_FORM_PRICE, "corrections": corrections}, sort_keys=True)
+        return hashlib.sha256(plan.encode("utf-8")).hexdigest()[:16]
+
+    async def rotate_price(self, driver: Driver, form_price: float) -> Optional[str]:
+        if not driver.stripe_product_id:
+            return driver.stripe_price_id
+
+        async with self.stripe_semaphore:
+            try:
+                price = await stripe.Price.create_async(
+                    product=driver.stripe_product_id, unit_amount=int(form_price * 100), currency="pln",
+                    idempotency_key=f"reprice-{self.signature}-{driver.id}"
+                )
+
+            except Exception:
+                logger.error(traceback.format_exc())
+                # The payment flow creates a fresh price from form_price when none is stored
+                return None
+
+            if driver.stripe_price_id and (driver.stripe_price_id != price.id):
+                try:
+                    await stripe.Price.modify_async(id=driver.stripe_price_id, active=False)
+
+                except Exception:
+                    # The new price is stored anyway, the old one is only left active
+                    logger.error(f"Old price is not deactivated. driver_id={driver.id}; "
+                                 f"stripe_price_id={driver.stripe_price_id}\n{traceback.format_exc()}")
+
+            return price.id
+
+    async def process_chunk(self, drivers: List[Driver]) -> int:
+        prices = await DriverForm.calculate_forms_data(db_models=drivers)
+        changed: List[Tuple[Driver, float]] = [
+            (driver, form_price) for driver, form_price in zip(drivers, prices)
+            if round(form_price, 2) != round(driver.form_price, 2)
+        ]
+        if (not changed) or self.dry_run:
+            return len(changed)
+
+        stripe_price_ids = await asyncio.gather(
+            *[self.rotate_price(driver=driver, form_price=form_price) for driver, form_price in changed])
+
+        rows = [(driver.id, form_price, price_id) for (driver, form_price), price_id in zip(changed, stripe_price_ids)]
+        if not await DbDriver.update_prices(rows=rows):
+            raise RuntimeError(f"Failed to write prices for drivers {rows[0][0]}..{rows[-1][0]}")
+
+        return len(changed)
+
+    async def run(self, restart: bool = False) -> bool:
+        checkpoint_db = DbRepricingCheckpoint(signature=self.signature)
+        if self.dry_run:
+            # A dry run starts from the first driver and writes nothing, the checkpoint is not created
+            checkpoint = await checkpoint_db.select()
+            if checkpoint is False:
+                return False
+
+        else:
+            checkpoint = await checkpoint_db.get_or_create()
+            if not checkpoint:
+                return False
+
+        if restart or self.dry_run:
+            last_driver_id, processed, changed = 0, 0, 0
+            if not self.dry_run:
+                await checkpoint_db.update(last_driver_id=0, processed=0, changed=0, finished=0)
+
+        elif checkpoint.finished:
+            logger.info(f"Drivers are already repriced with this plan. signature={self.signature}")
+            return True
+
+        else:
+            last_driver_id, processed, changed = checkpoint.last_driver_id, checkpoint.processed, checkpoint.changed
+
+        logger.info(f"Repricing drivers. signature={self.signature}; resume_from={last_driver_id}; "
+                    f"dry_run={self.dry_run}")
+
+        started = time.perf_counter()
+        run_processed = 0
+        while True:
+            drivers = await DbDriver.select_chunk(after_id=last_driver_id, limit=self.chunk_size)
+            if not drivers:
+                break
+
+            changed += await self.process_chunk(drivers=drivers)
+            processed += len(drivers)
+            run_processed += len(drivers)
+            last_driver_id = drivers[-1].id
+
+            if not self.dry_run:
+                await checkpoint_db.update(last_driver_id=last_driver_id, processed=processed, changed=changed)
+
+            elapsed = time.perf_counter() - started
+            logger.info(f"Repriced chunk. last_driver_id={last_driver_id}; processed={processed}; "
+                        f"changed={changed}; rate={run_processed / elapsed:.1f} rows/s")
+
+        if not self.dry_run:
+            await checkpoint_db.update(finished=1)
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Repricing is finished. processed={processed}; changed={changed}; "
+                    f"elapsed={elapsed:.1f}s; rate={run_processed / elapsed if elapsed else 0:.1f} rows/s")
+        return True
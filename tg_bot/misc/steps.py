@@ -0,0 +1,40 @@
+from typing import Callable, Dict, Optional, Union
+
+
+class Steps:
+    _by_id: Dict[str, Callable] = {}
+    _by_func: Dict[Callable, str] = {}
+
+    @classmethod
+    def register(cls, step_id: str, func: Callable):
+        cls._by_id[step_id] = func
+        cls._by_func[func] = step_id
+
+    @classmethod
+    def register_many(cls, steps: Dict[str, Callable]):
+        for step_id, func in steps.items():
+            cls.register(step_id=step_id, func=func)
+
+    @classmethod
+    def register_classmethods(cls, prefix: str, owner: type):
+        for name, attr in vars(owner).items():
+            if isinstance(attr, classmethod):
+                cls.register(step_id=f"{prefix}.{name}", func=getattr(owner, name))
+
+    @classmethod
+    def id(cls, step: Union[str, Callable, None]) -> Optional[str]:
+        if (step is None) or isinstance(step, str):
+            return step
+
+        step_id = cls._by_func.get(step)
+        if step_id is None:
+            raise LookupError(f"Step is not registered. step={step}")
+
+        return step_id
+
+    @classmethod
+    def get(cls, step: Union[str, Callable]) -> Callable:
+        if callable(step):
+            return step
+
+        return cls._by_id[step]
@@ -0,0 +1,65 @@
+import hashlib
+import hmac
+import logging
+import time
+import traceback
+from typing import Awaitable, Callable, Dict, Optional
+
+import stripe
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+StripeEventHandler = Callable[[str], Awaitable[bool]]
+
+
+class StripeWebhook:
+    SIGNATURE_HEADER = "Stripe-Signature"
+
+    def __init__(self, secret: str, handlers: Dict[str, StripeEventHandler]):
+        self.secret = secret
+        self.handlers = handlers
+
+    @staticmethod
+    def sign(payload: str, secret: str, timestamp: Optional[int] = None) -> str:
+        timestamp = timestamp if timestamp else int(time.time())
+        signature = hmac.new(
+            secret.encode("utf-8"), f"{timestamp}.{payload}".encode("utf-8"), hashlib.sha256).hexdigest()
+        return f"t={timestamp},v1={signature}"
+
+    async def handle_event(self, request: web.Request) -> web.Response:
+        payload = await request.text()
+        try:
+            event = stripe.Webhook.construct_event(
+                payload=payload, sig_header=request.headers.get(self.SIGNATURE_HEADER, ""), secret=self.secret)
+
+        except (ValueError, stripe.SignatureVerificationError) as ex:
+            logger.warning(f"Rejected Stripe event. reason={ex}")
+            return web.Response(status=400)
+
+        handler = self.handlers.get(event["type"])
+        if handler is None:
+            return web.Response()
+
+        stripe_invoice_id = event["data"]["object"]["id"]
+        logger.info(f"Stripe event received. type={event['type']}; stripe_invoice_id={stripe_invoice_id}")
+        try:
+            await handler(stripe_invoice_id)
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            # Stripe retries non-2xx deliveries. A failed handler rolls its claim back, so the retry applies it again
+            return web.Response(status=500)
+
+        return web.Response()
+
+    async def start(self, host: str, port: int, path: str) -> web.AppRunner:
+        app = web.Application()
+        app.router.add_post(path, self.handle_event)
+
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host=host, port=port).start()
+
+        logger.info(f"Stripe webhook is listening. host={host}; port={port}; path={path}")
+        return runner
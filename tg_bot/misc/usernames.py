@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import time
+import traceback
+from collections import OrderedDict
+from typing import Optional, Set, Tuple
+
+from config import Config
+from tg_bot.db_models.identity_map import IdentityMap
+from tg_bot.db_models.quick_commands import DbDriver
+from tg_bot.db_models.schemas import Driver
+
+logger = logging.getLogger(__name__)
+
+
+class UsernamesCache:
+    # tg_user_id -> (username, expires_at), least recently used first
+    _usernames: "OrderedDict[int, Tuple[Optional[str], float]]" = OrderedDict()
+    _refreshing: Set[int] = set()
+    _tasks: Set[asyncio.Task] = set()
+
+    @classmethod
+    def _run_in_background(cls, coro):
+        task = asyncio.create_task(cls._detached(coro))
+        cls._tasks.add(task)
+        task.add_done_callback(cls._tasks.discard)
+
+    @staticmethod
+    async def _detached(coro):
+        # The task outlives the update, it must not read or change the identity map another handler uses
+        IdentityMap.detach()
+        return await coro
+
+    @classmethod
+    def _lookup(cls, tg_user_id: int) -> Optional[Tuple[Optional[str], float]]:
+        cached = cls._usernames.get(tg_user_id)
+        if cached is None:
+            return None
+
+        if cached[1] <= time.monotonic():
+            del cls._usernames[tg_user_id]
+            return None
+
+        cls._usernames.move_to_end(tg_user_id)
+        return cached
+
+    @classmethod
+    def _store(cls, tg_user_id: int, username: Optional[str], ttl: float):
+        cls._usernames[tg_user_id] = (username, time.monotonic() + ttl)
+        cls._usernames.move_to_end(tg_user_id)
+        while len(cls._usernames) > Config.USERNAME_CACHE_SIZE:
+            cls._usernames.popitem(last=False)
+
+    @classmethod
+    async def remember(cls, tg_user_id: int, username: Optional[str]):
+        cached = cls._lookup(tg_user_id)
+        cls._store(tg_user_id=tg_user_id, username=username, ttl=Config.USERNAME_CACHE_TTL)
+
+        # A miss is checked against the drivers table once per TTL, the write happens only for a changed driver
+        if (cached is None) or (cached[0] != username):
+            cls._run_in_background(DbDriver.update_username(tg_user_id=tg_user_id, username=username))
+
+    @classmethod
+    async def refresh(cls, tg_user_id: int, fallback: Optional[str]):
+        try:
+            user = await Config.BOT.get_chat_member(chat_id=tg_user_id, user_id=tg_user_id)
+            await cls.remember(tg_user_id=tg_user_id, username=user.user.username)
+
+        except Exception:
+            logger.error(traceback.format_exc())
+            # Negative entry, the next attempt waits for the backoff instead of the next render
+            cls._store(tg_user_id=tg_user_id, username=fallback, ttl=Config.USERNAME_REFRESH_BACKOFF)
+
+        finally:
+            cls._refreshing.discard(tg_user_id)
+
+    @classmethod
+    async def get(cls, driver: Driver) -> Optional[str]:
+        cached = cls._lookup(driver.tg_user_id)
+        if cached:
+            return cached[0]
+
+        if driver.tg_user_id not in cls._refreshing:
+            cls._refreshing.add(driver.tg_user_id)
+            cls._run_in_background(cls.refresh(tg_user_id=driver.tg_user_id, fallback=driver.username))
+
+        return driver.username
@@ -3,20 +3,31 @@ import logging
 import re
 import os
 import json
+import traceback
 from copy import deepcopy
 from logging import Logger
-from typing import Union, Optional, Dict, List
+from typing import Union, Optional, Dict, List, Tuple
 
-from aiogram.exceptions import TelegramBadRequest
-from aiogram.types import ReplyKeyboardMarkup, InlineKeyboardMarkup, KeyboardButton, InlineKeyboardButton
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import ReplyKeyboardMarkup, InlineKeyboardMarkup, KeyboardButton, InlineKeyboardButton, Message
 from pydantic import BaseModel
 
 from config import Config
+from tg_bot.misc.cleanup import MessagesCleanup
+from tg_bot.misc.pricing import PricingPlan
 
 logger = logging.getLogger(__name__)
 localization: Dict[str, Dict] = {}
 corrections: Dict[str, Dict[str, float]] = {}
-msg_to_delete = {"secondary": {}}
+markups_cache: Dict[Tuple, Union[ReplyKeyboardMarkup, InlineKeyboardMarkup]] = {}
+markups_labels: Dict[str, Dict[str, Dict[str, Tuple[int, str]]]] = {}
+countries_labels: Dict[str, Dict[str, Tuple[int, str]]] = {}
+deletion_queue: asyncio.Queue = asyncio.Queue()
+deletion_workers = set()
+DELETION_WORKERS_COUNT = 4
+DELETION_FALLBACK_CONCURRENCY = 5
+MESSAGE_MAX_LENGTH = 4096
+MESSAGES_SEPARATOR = "\n\n"
 call_functions = {}
 
 
@@ -45,14 +56,47 @@ class Utils:
                 data = json.load(file)
 
             localization.update({lang: data})
+            await Utils.build_labels_index(lang=lang, lang_data=data)
+
+        markups_cache.clear()
 
         corrections_file = "tg_bot/misc/corrections.json"
         with open(os.path.abspath(corrections_file), "r", encoding="utf-8") as file:
             corrections.update(json.load(file))
 
+        PricingPlan.load(
+            base_price=Config.BASE_FORM_PRICE, corrections=corrections, lang_data=localization[Config.DEFAULT_LANG])
+
+    @staticmethod
+    async def build_labels_index(lang: str, lang_data: Dict):
+        lang_markups_labels = {}
+        lang_countries_labels = {}
+        countries_position = 0
+
+        for markup_key, rows in lang_data["markups"]["inline"].items():
+            if not isinstance(rows, list):
+                continue
+
+            labels = {}
+            for row in rows:
+                for btn_text, callback_data in row.items():
+                    if callback_data in labels:
+                        continue
+
+                    labels[callback_data] = (len(labels), btn_text)
+
+                    if ("countries_" in markup_key) and (callback_data not in lang_countries_labels):
+                        lang_countries_labels[callback_data] = (countries_position, btn_text)
+                        countries_position += 1
+
+            lang_markups_labels[markup_key] = labels
+
+        markups_labels[lang] = lang_markups_labels
+        countries_labels[lang] = lang_countries_labels
+
     @staticmethod
     async def send_step_message(user_id: int, texts: List[str], markups: List[InlineKeyboardMarkup] = None):
-        await Utils.delete_messages(user_id=user_id)
+        await Utils.delete_messages(user_id=user_id, defer=Config.DEFER_MESSAGES_DELETION)
 
         messages = []
         for text, counter in zip(texts, range(len(texts))):
@@ -69,13 +113,56 @@ class Utils:
             except IndexError:
                 markup = None
 
-            msg = await Config.BOT.send_message(chat_id=user_id, text=text, reply_markup=markup)
+            msg = await Utils.send_message_paced(chat_id=user_id, text=text, reply_markup=markup)
             await Utils.add_msg_to_delete(user_id=user_id, msg_id=msg.message_id)
 
             messages.append(msg)
 
         return messages
 
+    @staticmethod
+    async def send_message_paced(chat_id: int, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None,
+                                 attempts: int = 3) -> Message:
+        for attempt in range(attempts):
+            try:
+                return await Config.BOT.send_message(chat_id=chat_id, text=text, reply_markup=reply_markup)
+
+            except TelegramRetryAfter as ex:
+                if attempt == attempts - 1:
+                    raise
+
+                logger.warning(f"Flood limit is reached. chat_id={chat_id}; retry_after={ex.retry_after}")
+                await asyncio.sleep(ex.retry_after)
+
+    @staticmethod
+    async def merge_messages(messages: List[Tuple[str, Optional[InlineKeyboardMarkup]]]
+                             ) -> List[Tuple[str, Optional[InlineKeyboardMarkup]]]:
+        merged = []
+        for text, markup in messages:
+            if merged and (merged[-1][1] is None) and (markup is None) and (
+                    len(merged[-1][0]) + len(MESSAGES_SEPARATOR) + len(text) <= MESSAGE_MAX_LENGTH):
+                merged[-1] = (merged[-1][0] + MESSAGES_SEPARATOR + text, None)
+
+            else:
+                merged.append((text, markup))
+
+        return merged
+
+    @staticmethod
+    async def send_ordered_messages(user_id: int, messages: List[Tuple[str, Optional[InlineKeyboardMarkup]]],
+                                    merge: bool = True) -> List[Message]:
+        if merge:
+            messages = await Utils.merge_messages(messages)
+
+        # Telegram keeps the order of the requests only if every message is sent after the previous one
+        sent = []
+        for text, markup in messages:
+            msg = await Utils.send_message_paced(chat_id=user_id, text=text, reply_markup=markup)
+            await Utils.add_msg_to_delete(user_id=user_id, msg_id=msg.message_id)
+            sent.append(msg)
+
+        return sent
+
     @staticmethod
     async def get_message_text(key: str, lang: str) -> str:
         lang_data = localization[lang] if localization.get(lang) else localization[Config.DEFAULT_LANG]
@@ -113,11 +200,54 @@ class Utils:
 
         return markup
 
+    @staticmethod
+    async def additional_buttons_signature(additional_buttons: List[AdditionalButtons]) -> Tuple:
+        return tuple(
+            (add_buttons_obj.index, add_buttons_obj.action, tuple(add_buttons_obj.buttons.items()))
+            for add_buttons_obj in additional_buttons
+        )
+
     @classmethod
     async def get_markup(
             cls, lang: str, mtype: Optional[str] = None, key: Optional[str] = None,
             additional_buttons: List[AdditionalButtons] = [], without_buttons: List[str] = [],
             user_id: Union[str, int] = None, markup: Optional[InlineKeyboardMarkup] = None
+    ) -> Union[ReplyKeyboardMarkup, InlineKeyboardMarkup, None]:
+        if not (key or additional_buttons):
+            return markup
+
+        lang = lang if localization.get(lang) else Config.DEFAULT_LANG
+        cache_key = (
+            lang, mtype, key, user_id in Config.ADMINS,
+            tuple(sorted(btn for btn in without_buttons if isinstance(btn, str))),
+            await cls.additional_buttons_signature(additional_buttons)
+        )
+        cached_markup = markups_cache.get(cache_key)
+        if cached_markup is None:
+            cached_markup = await cls.compile_markup(
+                lang=lang, mtype=mtype, key=key, additional_buttons=deepcopy(additional_buttons),
+                without_buttons=without_buttons, user_id=user_id
+            )
+            if cached_markup is None:
+                return
+
+            markups_cache[cache_key] = cached_markup
+
+        return await cls.copy_markup(cached_markup)
+
+    @staticmethod
+    async def copy_markup(markup: Union[ReplyKeyboardMarkup, InlineKeyboardMarkup]
+                          ) -> Union[ReplyKeyboardMarkup, InlineKeyboardMarkup]:
+        # Callers add rows and rewrite button fields, so rows and buttons are copied, not the whole tree
+        field = "inline_keyboard" if isinstance(markup, InlineKeyboardMarkup) else "keyboard"
+        rows = [[btn.model_copy() for btn in row] for row in getattr(markup, field)]
+        return markup.model_copy(update={field: rows})
+
+    @classmethod
+    async def compile_markup(
+            cls, lang: str, mtype: Optional[str] = None, key: Optional[str] = None,
+            additional_buttons: List[AdditionalButtons] = [], without_buttons: List[str] = [],
+            user_id: Union[str, int] = None
     ) -> Union[ReplyKeyboardMarkup, InlineKeyboardMarkup, None]:
         markup_data = localization[lang] if localization.get(lang) else localization[Config.DEFAULT_LANG]
 
@@ -157,7 +287,7 @@ class Utils:
                 elif isinstance(markup, ReplyKeyboardMarkup):
                     markup.keyboard.append([KeyboardButton(text=btn_text)])
 
-        elif additional_buttons:
+        else:
             markup = InlineKeyboardMarkup(inline_keyboard=[])
             markup = await cls.processing_additional_buttons(
                 markup_data=markup_data, markup=markup, additional_buttons=additional_buttons)
@@ -178,51 +308,95 @@ class Utils:
     @staticmethod
     async def add_msg_to_delete(user_id: Union[str, int], msg_id: Union[str, int], secondary: bool = False):
         try:
-            if secondary:
-                if user_id not in msg_to_delete["secondary"]:
-                    msg_to_delete["secondary"][user_id] = []
+            await MessagesCleanup.add(user_id=user_id, msg_id=msg_id, secondary=secondary)
 
-                msg_to_delete["secondary"][user_id].append(msg_id)
-                return
+        except Exception as ex:
+            logger.error(f"Couldn't add msg_id to msg_to_delete\n{ex}")
 
-            if user_id not in msg_to_delete:
-                msg_to_delete[user_id] = []
+    @staticmethod
+    async def delete_message_paced(chat_id: int, message_id: int, semaphore: asyncio.Semaphore,
+                                   attempts: int = 3) -> bool:
+        async with semaphore:
+            for attempt in range(attempts):
+                try:
+                    return await Config.BOT.delete_message(chat_id=chat_id, message_id=message_id)
 
-            msg_to_delete[user_id].append(msg_id)
+                except TelegramRetryAfter as ex:
+                    if attempt == attempts - 1:
+                        raise
 
-        except Exception as ex:
-            logger.error(f"Couldn't add msg_id to msg_to_delete\n{ex}")
+                    logger.warning(f"Flood limit is reached. chat_id={chat_id}; retry_after={ex.retry_after}")
+                    await asyncio.sleep(ex.retry_after)
 
     @staticmethod
-    async def delete_messages(user_id: Optional[int] = None, secondary: bool = False):
+    async def delete_messages_batch(chat_id: int, message_ids: List[int], attempts: int = 3):
+        for chunk_from in range(0, len(message_ids), 100):
+            chunk = message_ids[chunk_from:chunk_from + 100]
+            for attempt in range(attempts):
+                try:
+                    await Config.BOT.delete_messages(chat_id=chat_id, message_ids=chunk)
+
+                except TelegramRetryAfter as ex:
+                    if attempt == attempts - 1:
+                        raise
+
+                    logger.warning(f"Flood limit is reached. chat_id={chat_id}; retry_after={ex.retry_after}")
+                    await asyncio.sleep(ex.retry_after)
+                    continue
+
+                except TelegramBadRequest:
+                    # One by one, a few at a time, so a single bad id does not keep the rest
+                    semaphore = asyncio.Semaphore(DELETION_FALLBACK_CONCURRENCY)
+                    await asyncio.gather(
+                        *[Utils.delete_message_paced(chat_id=chat_id, message_id=msg_id, semaphore=semaphore)
+                          for msg_id in chunk],
+                        return_exceptions=True
+                    )
+
+                break
+
+    @staticmethod
+    async def deletion_worker():
+        while True:
+            chat_id, message_ids = await deletion_queue.get()
+            try:
+                await Utils.delete_messages_batch(chat_id=chat_id, message_ids=message_ids)
+
+            except Exception:
+                logger.error(traceback.format_exc())
+
+            finally:
+                deletion_queue.task_done()
+
+    @staticmethod
+    async def defer_messages_deletion(chat_id: int, message_ids: List[int]):
+        if not deletion_workers:
+            for _ in range(DELETION_WORKERS_COUNT):
+                deletion_workers.add(asyncio.create_task(Utils.deletion_worker()))
+
+        deletion_queue.put_nowait((chat_id, message_ids))
+
+    @staticmethod
+    async def delete_messages(user_id: Optional[int] = None, secondary: bool = False, defer: bool = False):
         try:
             if not user_id:
-                for uid in msg_to_delete:
-                    for msg_id in msg_to_delete.get(uid):
-                        try:
-                            await Config.BOT.delete_message(chat_id=uid, message_id=msg_id)
-                        except TelegramBadRequest:
-                            continue
+                for uid, message_ids in (await MessagesCleanup.take_all()).items():
+                    await Utils.delete_messages_batch(chat_id=uid, message_ids=message_ids)
 
                 return
 
-            if secondary:
-                for msg_id in msg_to_delete["secondary"][user_id]:
-                    try:
-                        await Config.BOT.delete_message(chat_id=user_id, message_id=msg_id)
-                    except TelegramBadRequest:
-                        continue
+            message_ids = await MessagesCleanup.take(user_id=user_id, secondary=secondary)
+            if not message_ids:
+                return
+
+            if defer:
+                await Utils.defer_messages_deletion(chat_id=user_id, message_ids=message_ids)
 
             else:
-                for msg_id in msg_to_delete[user_id]:
-                    try:
-                        await Config.BOT.delete_message(chat_id=user_id, message_id=msg_id)
-                    except TelegramBadRequest:
-                        continue
+                await Utils.delete_messages_batch(chat_id=user_id, message_ids=message_ids)
 
-            msg_to_delete[user_id].clear()
-        except KeyError:
-            return
+        except Exception:
+            logger.error(traceback.format_exc())
 
     @staticmethod
     async def is_valid_name(name: str) -> bool:
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import traceback
+from multiprocessing import Process, Queue
+from typing import Any, Dict
+
+from aiohttp import web
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+from config import Config
+from tg_bot.handlers import routers
+from tg_bot.misc.bootstrap import Bootstrap
+from tg_bot.misc.utils import Utils as Ut
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookServer:
+    SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+    QUEUE_SIZE = 10000
+    WORKER_CONCURRENCY = 100
+
+    @staticmethod
+    def update_user_id(update: Dict[str, Any]) -> int:
+        for value in update.values():
+            if not isinstance(value, dict):
+                continue
+
+            user = value.get("from") or value.get("user")
+            if user:
+                return user["id"]
+
+            chat = value.get("chat") or value.get("message", {}).get("chat")
+            if chat:
+                return chat["id"]
+
+        return 0
+
+    @classmethod
+    async def set_webhook(cls):
+        await Config.BOT.set_webhook(
+            url=Config.WEBHOOK_URL + Config.WEBHOOK_PATH, secret_token=Config.WEBHOOK_SECRET or None,
+            allowed_updates=Config.DISPATCHER.resolve_used_update_types(), drop_pending_updates=True
+        )
+        logger.info(f"Webhook is set. url={Config.WEBHOOK_URL + Config.WEBHOOK_PATH}; "
+                    f"workers={Config.WEBHOOK_WORKERS}")
+
+    @classmethod
+    async def serve(cls, app: web.Application):
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host=Config.WEBHOOK_HOST, port=Config.WEBHOOK_PORT).start()
+        await asyncio.Event().wait()
+
+    @classmethod
+    async def run_single(cls):
+        await Bootstrap.prepare_dispatcher()
+
+        app = web.Application()
+        SimpleRequestHandler(
+            dispatcher=Config.DISPATCHER, bot=Config.BOT, secret_token=Config.WEBHOOK_SECRET or None
+        ).register(app, path=Config.WEBHOOK_PATH)
+        setup_application(app, Config.DISPATCHER, bot=Config.BOT)
+
+        await cls.set_webhook()
+        await cls.serve(app)
+
+    @classmethod
+    async def run_workers(cls):
+        queues = [Queue(maxsize=cls.QUEUE_SIZE) for _ in range(Config.WEBHOOK_WORKERS)]
+        workers = [Process(target=Ut.wrapper, args=(cls.worker, worker_id, queue))
+                   for worker_id, queue in enumerate(queues)]
+        for worker in workers:
+            worker.start()
+
+        if Config.FSM_STORAGE == "memory":
+            logger.warning("FSM_STORAGE=memory keeps states inside every worker, "
+                           "use postgres or redis to share them between restarts")
+
+        if Config.FORMS_COUNTER_STORAGE == "memory":
+            logger.warning("FORMS_COUNTER_STORAGE=memory counts forms inside every worker, they differ until "
+                           "the next reconcile, use postgres to share one counter between the workers")
+
+        # The front process only routes updates, the routers are needed to resolve the used update types
+        Config.DISPATCHER.include_routers(*routers)
+
+        async def handle_update(request: web.Request) -> web.Response:
+            if Config.WEBHOOK_SECRET and request.headers.get(cls.SECRET_HEADER) != Config.WEBHOOK_SECRET:
+                return web.Response(status=401)
+
+            update = await request.json()
+            queue = queues[cls.update_user_id(update) % len(queues)]
+            await asyncio.get_running_loop().run_in_executor(None, queue.put, update)
+            return web.Response()
+
+        app = web.Application()
+        app.router.add_post(Config.WEBHOOK_PATH, handle_update)
+
+        await cls.set_webhook()
+        await cls.serve(app)
+
+    @classmethod
+    async def worker(cls, worker_id: int, updates_queue: Queue):
+        Bootstrap.setup_logging()
+        logger.info(f"Webhook worker has started! worker_id={worker_id}")
+
+        await Bootstrap.prepare_dispatcher(connect=True, pool_name=f"worker-{worker_id}")
+
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(cls.WORKER_CONCURRENCY)
+        user_locks: Dict[int, asyncio.Lock] = {}
+        user_pending: Dict[int, int] = {}
+        tasks = set()
+
+        async def process_update(user_id: int, update: Dict[str, Any]):
+            try:
+                async with user_locks[user_id]:
+                    await Config.DISPATCHER.feed_raw_update(bot=Config.BOT, update=update)
+
+            except Exception:
+                logger.error(traceback.format_exc())
+
+            finally:
+                semaphore.release()
+                user_pending[user_id] -= 1
+                if not user_pending[user_id]:
+                    del user_pending[user_id]
+                    del user_locks[user_id]
+
+        while True:
+            update = await loop.run_in_executor(None, updates_queue.get)
+            if update is None:
+                break
+
+            await semaphore.acquire()
+
+            # asyncio.Lock wakes waiters in FIFO order, so updates of one user are handled in arrival order
+            user_id = cls.update_user_id(update)
+            user_locks.setdefault(user_id, asyncio.Lock())
+            user_pending[user_id] = user_pending.get(user_id, 0) + 1
+
+            task = asyncio.create_task(process_update(user_id=user_id, update=update))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)